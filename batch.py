@@ -0,0 +1,304 @@
+"""
+Headless batch import of whole extracted game folders
+
+Parsing runs in a process pool, parsed geometry streams back to this
+(single) process which either builds it into Blender and saves a .blend
+per chunk of files, or writes it out as .npz files
+
+Parse only, plain Python (no Blender needed):
+    python -m <addon_package>.batch <folder> --out <npz_dir>
+
+Full import, one .blend per chunk of files:
+    blender -b --python-expr "from <addon_package> import batch; batch.main(['<folder>', '--blend-dir', '<out_dir>'])"
+
+(<addon_package> is the add-on's folder name, e.g. TelltaleGames_D3DMesh_Importer,
+or bl_ext.user_default.telltalegames_d3dmesh_importer for an installed extension)
+"""
+
+import argparse
+import contextlib
+import importlib
+import itertools
+import os
+import signal
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from math import pi
+
+import numpy as np
+
+MESH_EXTS = (".d3dmesh",)
+
+# Seconds one file may take to parse before it counts as failed
+PARSE_TIMEOUT = 60
+
+def discover(paths, exts = MESH_EXTS) -> list[str]:
+    """Every file with one of exts under paths (files are taken as is), sorted"""
+    found = []
+    for path in paths:
+        if os.path.isfile(path):
+            found.append(path)
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            found.extend(os.path.join(root, name) for name in sorted(files) if name.lower().endswith(exts))
+    return found
+
+@contextlib.contextmanager
+def time_limit(seconds : float):
+    """
+    TimeoutError inside the with block once it ran for seconds
+
+    Uses SIGALRM, so only limits anything on Unix in a main thread (pool
+    workers, the CLI), elsewhere the block runs unlimited
+    """
+    if not seconds or not hasattr(signal, "SIGALRM") or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    def expire(signum, frame):
+        raise TimeoutError(f"took longer than {seconds:g} s")
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+def _parse_file(path : str, options : dict) -> dict:
+    """Worker: parse one file, never raises (or takes longer than options["timeout"]) so one bad file can't take the run down"""
+    import io
+    from .cache import MeshCache, load_d3dmesh
+    start = time.perf_counter()
+    result = {"path": path, "ok": False, "mesh": None, "error": None}
+    log = io.StringIO()
+    try:
+        with time_limit(options.get("timeout", PARSE_TIMEOUT)), contextlib.redirect_stdout(log if not options.get("verbose") else sys.stdout):
+            cache = MeshCache(options["cache_dir"], options["cache_max_mb"] << 20) if options.get("cache_dir") else None
+            mesh = load_d3dmesh(path, cache, verbose=options.get("verbose", False), trace_path=options.get("trace_path"))
+            result["cached"] = bool(cache and cache.hits)
+        if mesh is None:
+            result["error"] = "unsupported version or no geometry"
+        else:
+            result["ok"] = True
+            result["mesh"] = mesh
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        result["traceback"] = traceback.format_exc()
+    result["parse_ms"] = (time.perf_counter() - start) * 1000
+    return result
+
+def pool_function(module : str, func : str):
+    """
+    module.func of this add-on under a package name spawned interpreters can import
+
+    Installed extensions live in Blender's bl_ext.* namespace, which doesn't
+    exist in a worker process, so there the add-on folder is imported as a
+    top-level package instead
+    """
+    package = __package__
+    if "." in package:
+        parent, package = os.path.split(os.path.dirname(os.path.abspath(__file__)))
+        if parent not in sys.path:
+            sys.path.insert(0, parent)
+    return getattr(importlib.import_module(f"{package}.{module}"), func)
+
+def _pool_worker():
+    return pool_function("batch", "_parse_file")
+
+def parse_all(paths : list[str], options : dict, jobs : int = None):
+    """
+    Parse files across a process pool, yields results as they finish
+
+    At most 2 files per worker are in flight, so finished meshes only pile
+    up as fast as the caller consumes them, not with the file count
+    """
+    if jobs == 1:
+        for path in paths:
+            yield _parse_file(path, options)
+        return
+    worker = _pool_worker()
+    todo = iter(paths)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        window = 2 * (jobs or os.cpu_count() or 1)
+        running = {pool.submit(worker, path, options) for path in itertools.islice(todo, window)}
+        while running:
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            running |= {pool.submit(worker, path, options) for path in itertools.islice(todo, len(done))}
+            while done:
+                yield done.pop().result()
+
+def write_npz(result : dict, root : str, out_dir : str, parse_lods = False, join_submeshes = False, uv_layers = 'MERGE') -> str:
+    """Save one file's objects as <out_dir>/<path relative to root>.npz"""
+    from .d3dmesh import mesh_parts
+    rel = os.path.relpath(result["path"], root) if os.path.isdir(root) else os.path.basename(result["path"])
+    out_path = os.path.join(out_dir, rel + ".npz")
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    mesh = result["mesh"]
+    parts = mesh_parts(mesh, parse_lods, join_submeshes, uv_layers)
+    arrays = {"names": np.array([part.name for part in parts])}
+    for i, part in enumerate(parts):
+        arrays[f"verts_{i}"] = mesh.positions[part.vert_ids]
+        arrays[f"faces_{i}"] = part.faces
+        for name in part.uvs:
+            arrays[f"{name.lower()}_{i}"] = mesh.uvs[name][part.vert_ids]
+        if mesh.normals is not None:
+            arrays[f"normals_{i}"] = mesh.normals[part.vert_ids]
+        for name, rgba in mesh.colors.items():
+            arrays[f"{name.lower()}_{i}"] = rgba[part.vert_ids]
+    np.savez(out_path, **arrays)
+    return out_path
+
+class BlendChunkBuilder:
+    """
+    Builds parsed results into the current Blender session and saves every chunk_size files as a .blend
+
+    With instance_meshes, identical parts within a chunk share one mesh (see bpy_build.MeshInstances)
+    """
+
+    def __init__(self, blend_dir : str, chunk_size : int, rotation = (pi/2, 0, 0), scale = (1, 1, 1),
+                 parse_lods = False, join_submeshes = False, uv_layers = 'MERGE', instance_meshes = True):
+        self.blend_dir = blend_dir
+        self.chunk_size = chunk_size
+        self.parse_lods = parse_lods
+        self.join_submeshes = join_submeshes
+        self.uv_layers = uv_layers
+        self.rotation = rotation
+        self.scale = scale
+        self.chunk_num = 0
+        self.files_in_chunk = 0
+        self.instance_meshes = instance_meshes
+        self.instances = None
+        os.makedirs(blend_dir, exist_ok=True)
+
+    def add(self, result : dict):
+        import bpy
+        from .bpy_build import MeshInstances, buildD3DMesh
+        if self.instance_meshes and self.instances is None:
+            self.instances = MeshInstances()
+        for obj in buildD3DMesh(result["mesh"], self.parse_lods, self.join_submeshes, self.uv_layers, instances=self.instances):
+            bpy.context.scene.collection.objects.link(obj)
+            obj.rotation_euler = self.rotation
+            obj.scale = self.scale
+        self.files_in_chunk += 1
+        if self.files_in_chunk >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        import bpy
+        if self.files_in_chunk == 0:
+            return
+        self.chunk_num += 1
+        path = os.path.join(self.blend_dir, f"chunk_{self.chunk_num:04d}.blend")
+        bpy.ops.wm.save_as_mainfile(filepath=path, copy=True)
+        print(f"Saved {self.files_in_chunk} files to {path}")
+        if self.instances is not None:
+            print(f"Meshes: {self.instances.summary()}")
+        # Start the next chunk from an empty scene
+        scene_objects = list(bpy.context.scene.collection.objects)
+        meshes = [o.data for o in scene_objects if o.type == 'MESH']
+        # Meshes don't outlive their chunk, so neither does sharing them
+        bpy.data.batch_remove(scene_objects + list(set(meshes)))
+        self.files_in_chunk = 0
+        self.instances = None
+
+def run(paths : list[str],
+        jobs : int = None,
+        out_dir : str = None,
+        blend_dir : str = None,
+        chunk_size : int = 50,
+        parse_lods = False,
+        join_submeshes = False,
+        uv_layers = 'MERGE',
+        cache_dir : str = None,
+        cache_max_mb : int = 1024,
+        trace_path : str = None,
+        timeout : float = PARSE_TIMEOUT,
+        instance_meshes = True,
+        verbose = False) -> list[dict]:
+    """Discover, parse and build/write everything, returns the failed results"""
+    files = discover(paths)
+    total = len(files)
+    root = paths[0] if len(paths) == 1 else os.path.commonpath([os.path.abspath(p) for p in paths])
+    print(f"Found {total} files, parsing with {jobs or os.cpu_count()} workers")
+    options = {"verbose": verbose, "cache_dir": cache_dir, "cache_max_mb": cache_max_mb, "trace_path": trace_path, "timeout": timeout}
+    builder = BlendChunkBuilder(blend_dir, chunk_size, parse_lods=parse_lods, join_submeshes=join_submeshes, uv_layers=uv_layers,
+                                instance_meshes=instance_meshes) if blend_dir else None
+
+    start = time.perf_counter()
+    failures = []
+    parse_ms = build_ms = 0.0
+    for done, result in enumerate(parse_all(files, options, jobs), 1):
+        rel = os.path.relpath(result["path"], root) if os.path.isdir(root) else result["path"]
+        if result["ok"]:
+            build_start = time.perf_counter()
+            try:
+                if builder: builder.add(result)
+                if out_dir: write_npz(result, root, out_dir, parse_lods, join_submeshes, uv_layers)
+            except Exception as e:
+                result["ok"] = False
+                result["error"] = f"build: {type(e).__name__}: {e}"
+                result["traceback"] = traceback.format_exc()
+            result["build_ms"] = (time.perf_counter() - build_start) * 1000
+            build_ms += result["build_ms"]
+        parse_ms += result["parse_ms"]
+        if result["ok"]:
+            verts = result["mesh"].vert_count
+            tris = len(result["mesh"].faces)
+            print(f"[{done}/{total}] OK   {rel} ({result['parse_ms']:.0f} ms {'cached' if result.get('cached') else 'parse'}, {result.get('build_ms', 0):.0f} ms output, {verts} verts, {tris} tris)")
+        else:
+            failures.append(result)
+            print(f"[{done}/{total}] FAIL {rel} ({result['parse_ms']:.0f} ms): {result['error']}")
+    if builder: builder.flush()
+
+    elapsed = time.perf_counter() - start
+    print("-----------")
+    print(f"{total - len(failures)}/{total} files imported in {elapsed:.1f} s "
+          f"({total / elapsed if elapsed else 0:.1f} files/s, {parse_ms/1000:.1f} s parse CPU, {build_ms/1000:.1f} s output)")
+    if failures:
+        print(f"{len(failures)} failed:")
+        for result in failures:
+            print(f"  {result['path']}: {result['error']}")
+            if verbose and result.get("traceback"):
+                print(result["traceback"])
+    return failures
+
+def main(argv = None) -> int:
+    parser = argparse.ArgumentParser(prog="batch", description="Batch import Telltale .d3dmesh files")
+    parser.add_argument("paths", nargs="+", help="Folders (searched recursively) and/or files")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Parse worker processes (default: CPU count, 1 = no pool)")
+    parser.add_argument("--out", help="Write parsed geometry as .npz files into this folder")
+    parser.add_argument("--blend-dir", help="Build into Blender and save a .blend per chunk into this folder (needs Blender)")
+    parser.add_argument("--chunk", type=int, default=50, help="Files per .blend (default 50)")
+    parser.add_argument("--lods", action="store_true", help="Import every LOD, not just the first")
+    parser.add_argument("--join", action="store_true", help="Join submeshes into one object per LOD")
+    parser.add_argument("--uv-layers", choices=("MERGE", "SPLIT", "NO"), default="MERGE", help="UV2-UV6 on the same object, as copies of it, or not at all (default MERGE)")
+    parser.add_argument("--no-instancing", dest="instance_meshes", action="store_false", help="Give every object its own mesh, even identical ones (default: identical parts in a chunk share one)")
+    parser.add_argument("--cache", help="Cache parsed meshes in this folder, unchanged files skip parsing on the next run")
+    parser.add_argument("--cache-size", type=int, default=1024, help="Cache size limit in MB (default 1024)")
+    parser.add_argument("--trace", help="Append a JSON line per parsed section (offset, length, time) and per file outcome to this file")
+    parser.add_argument("--timeout", type=float, default=PARSE_TIMEOUT, help=f"Seconds a file may take to parse before it counts as failed, 0 = no limit (default {PARSE_TIMEOUT})")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Parser debug output and failure tracebacks")
+    args = parser.parse_args(argv)
+
+    failures = run(args.paths,
+                   jobs=args.jobs,
+                   out_dir=args.out,
+                   blend_dir=args.blend_dir,
+                   chunk_size=args.chunk,
+                   parse_lods=args.lods,
+                   join_submeshes=args.join,
+                   uv_layers=args.uv_layers,
+                   cache_dir=args.cache,
+                   cache_max_mb=args.cache_size,
+                   trace_path=args.trace,
+                   timeout=args.timeout,
+                   instance_meshes=args.instance_meshes,
+                   verbose=args.verbose)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+"""
+Parser benchmarks on synthetic .d3dmesh files
+
+Every case is written by synth.write_d3dmesh, parsed a few times and
+timed per section through the parser's JSON lines trace. Sections are
+grouped into header, materials, LOD tables, index buffer and vertex
+streams, plus the mesh build (mesh_parts and skin groups, and
+buildD3DMesh when run inside Blender). Each group's best run is reported
+as MB/s (of its bytes in the file) and vertices/s.
+
+Run it (no Blender needed) and save the results as a baseline:
+    python -m <addon_package>.bench --save <baseline.json>
+
+Then after a change, fail (exit code 1) if any group got slower than the
+baseline by more than the threshold:
+    python -m <addon_package>.bench --compare <baseline.json> --threshold 0.2
+
+Including Blender's mesh build:
+    blender -b --python-expr "from <addon_package> import bench; bench.main(['--compare', '<baseline.json>'])"
+
+Baselines only mean something on the machine (and Python/NumPy) they
+were made on
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from .synth import write_d3dmesh
+
+BASELINE_VERSION = 1
+
+# name -> write_d3dmesh arguments (vert_count and tri_count get multiplied by --scale)
+CASES = {
+    "small_static": dict(vert_count=4000, tri_count=6000, lod_count=1, submesh_count=2, position_format=42, uv_formats=(25,)),
+    "prop_f42": dict(vert_count=60000, tri_count=100000, lod_count=3, submesh_count=4, position_format=42,
+                     uv_formats=(25, 25), normal_format=38),
+    "prop_f27": dict(vert_count=60000, tri_count=100000, lod_count=3, submesh_count=4, position_format=27,
+                     uv_formats=(25, 25), normal_format=38),
+    "prop_f4": dict(vert_count=60000, tri_count=100000, lod_count=3, submesh_count=4, position_format=4,
+                    uv_formats=(3, 3), normal_format=26),
+    "character_skinned": dict(vert_count=120000, tri_count=200000, lod_count=4, submesh_count=8, position_format=42,
+                              uv_formats=(25, 24), normal_format=38, weight_format=42, bone_count=120, color_format=33),
+    "env_uv6": dict(vert_count=250000, tri_count=400000, lod_count=1, submesh_count=16, position_format=27,
+                    uv_formats=(25, 25, 24, 24, 3, 25), normal_format=26, color_format=39),
+}
+
+GROUPS = ("header", "materials", "lod_tables", "index_buffer", "vertex_streams", "build", "blender_build")
+
+def section_group(section : str) -> str:
+    """Benchmark group of a parser trace section name"""
+    match section:
+        case "Section 2":
+            return "materials"
+        case "Section 3":
+            return "lod_tables"
+        case "Index buffer A" | "Index buffer B":
+            return "index_buffer"
+        case "Header" | "Section 1" | "Section 4" | "Section 5" | "Section 6" | "Section 7" | "Section 8" | "Section 9" | "Section 10" | "Section 11" | "Section 12":
+            return "header"
+    # Positions and every other vertex stream are traced under their stream name
+    return "vertex_streams"
+
+def _blender_available() -> bool:
+    try:
+        import bpy
+    except ModuleNotFoundError:
+        return False
+    return hasattr(bpy, "data")
+
+def _time_parse(path : str, trace_path : str) -> dict:
+    """One parse: (the mesh, {group: [ms, bytes]} from its trace)"""
+    from .d3dmesh import parse_d3dmesh
+    if os.path.exists(trace_path):
+        os.remove(trace_path)
+    mesh = parse_d3dmesh(path, verbose=False, trace_path=trace_path)
+    groups = {}
+    with open(trace_path, "r", encoding='utf-8') as f:
+        for line in f:
+            entry = json.loads(line)
+            if "section" not in entry or "length" not in entry:
+                continue
+            group = groups.setdefault(section_group(entry["section"]), [0.0, 0])
+            group[0] += entry["ms"]
+            group[1] += entry["length"]
+    return mesh, groups
+
+def _time_build(mesh) -> float:
+    """ms of the bpy-free part of building every LOD: submesh gathering, vertex compaction, skin groups"""
+    from .d3dmesh import mesh_parts, skin_groups
+    start = time.perf_counter()
+    for part in mesh_parts(mesh, parse_lods=True, join_submeshes=False):
+        skin_groups(mesh, part)
+    return (time.perf_counter() - start) * 1000
+
+def _time_blender_build(mesh) -> float:
+    """ms of buildD3DMesh for every LOD, the objects are deleted afterwards"""
+    import bpy
+    from .bpy_build import buildD3DMesh
+    start = time.perf_counter()
+    objs = buildD3DMesh(mesh, parse_lods=True, join_submeshes=False)
+    elapsed = (time.perf_counter() - start) * 1000
+    for obj in objs:
+        data = obj.data
+        bpy.data.objects.remove(obj)
+        bpy.data.meshes.remove(data)
+    return elapsed
+
+def run_case(name : str, params : dict, data_dir : str, repeat = 5, blender = False) -> dict:
+    """Best of `repeat` runs of a case: {"params", "file_size", "vert_count", "groups": {group: {ms, bytes, mb_s, verts_s}}}"""
+    path = os.path.join(data_dir, name + ".d3dmesh")
+    info = write_d3dmesh(path, **params)
+    trace_path = os.path.join(data_dir, name + ".trace.jsonl")
+    best = {}
+    for run in range(repeat):
+        gc.collect()
+        mesh, groups = _time_parse(path, trace_path)
+        geometry_bytes = groups.get("index_buffer", [0, 0])[1] + groups.get("vertex_streams", [0, 0])[1]
+        groups["build"] = [_time_build(mesh), geometry_bytes]
+        if blender:
+            groups["blender_build"] = [_time_blender_build(mesh), geometry_bytes]
+        for group, (ms, size) in groups.items():
+            if group not in best or ms < best[group][0]:
+                best[group] = (ms, size)
+        del mesh
+    os.remove(trace_path)
+    verts = info["vert_count"]
+    return {
+        "params": {key: list(value) if isinstance(value, tuple) else value for key, value in params.items()},
+        "file_size": info["file_size"],
+        "vert_count": verts,
+        "groups": {group: {"ms": round(ms, 4),
+                           "bytes": size,
+                           "mb_s": round(size / (1 << 20) / (ms / 1000), 2) if ms > 0 else None,
+                           "verts_s": round(verts / (ms / 1000)) if ms > 0 else None}
+                   for group, (ms, size) in sorted(best.items(), key=lambda item: GROUPS.index(item[0]))},
+    }
+
+def machine_info() -> dict:
+    return {"platform": platform.platform(), "processor": platform.processor() or platform.machine(),
+            "python": platform.python_version(), "numpy": np.__version__}
+
+def run(case_names = None, scale = 1.0, repeat = 5, data_dir = None, verbose = True) -> dict:
+    """Run the benchmark cases (all by default), returns the baseline dict"""
+    blender = _blender_available()
+    results = {"version": BASELINE_VERSION, "machine": machine_info(), "scale": scale, "repeat": repeat,
+               "blender": blender, "cases": {}}
+    with tempfile.TemporaryDirectory(prefix="d3dmesh_bench") as tmp_dir:
+        for name in case_names or CASES:
+            params = dict(CASES[name])
+            params["vert_count"] = max(int(params["vert_count"] * scale), 1)
+            params["tri_count"] = max(int(params["tri_count"] * scale), 1)
+            results["cases"][name] = run_case(name, params, data_dir or tmp_dir, repeat, blender)
+            if verbose: print(f"{name}: done")
+    return results
+
+def compare(results : dict, baseline : dict, threshold = 0.2, min_ms = 0.2) -> list[tuple]:
+    """
+    (case, group, baseline MB/s, current MB/s, drop) of every group whose
+    throughput dropped by more than threshold (0.2 = 20%).
+    Groups taking under min_ms in the baseline are too noisy to judge and skipped
+    """
+    regressions = []
+    for name, case in results["cases"].items():
+        old_case = baseline["cases"].get(name)
+        if old_case is None or old_case["params"] != case["params"]:
+            continue
+        for group, current in case["groups"].items():
+            old = old_case["groups"].get(group)
+            if old is None or old["ms"] < min_ms or not current["ms"]:
+                continue
+            # Same bytes on both sides, so the throughput ratio is the inverse time ratio
+            drop = 1 - old["ms"] / current["ms"]
+            if drop > threshold:
+                regressions.append((name, group, old["mb_s"], current["mb_s"], drop))
+    return regressions
+
+def print_results(results : dict, baseline : dict = None):
+    print(f"{'case':<20}{'group':<16}{'ms':>10}{'MB/s':>10}{'Mverts/s':>10}{'vs base':>10}")
+    for name, case in results["cases"].items():
+        old_case = (baseline or {}).get("cases", {}).get(name)
+        if old_case is not None and old_case["params"] != case["params"]:
+            old_case = None
+        for group, current in case["groups"].items():
+            old = old_case["groups"].get(group) if old_case else None
+            change = f"{old['ms'] / current['ms'] - 1:+.0%}" if old and current["ms"] else ""
+            mb_s = f"{current['mb_s']:.1f}" if current["mb_s"] is not None else "-"
+            mverts_s = f"{current['verts_s'] / 1e6:.2f}" if current["verts_s"] is not None else "-"
+            print(f"{name:<20}{group:<16}{current['ms']:>10.3f}{mb_s:>10}{mverts_s:>10}{change:>10}")
+
+def load_baseline(path : str) -> dict:
+    with open(path, "r", encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get("version") != BASELINE_VERSION:
+        raise ValueError(f"{path} is a version {baseline.get('version')} baseline, expected {BASELINE_VERSION}")
+    return baseline
+
+def main(argv = None) -> int:
+    parser = argparse.ArgumentParser(prog="bench", description="Benchmark the .d3dmesh parser on synthetic files")
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), help="Cases to run (default: all)")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every case's vertex and triangle counts (default 1)")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per case, the best one counts (default 5)")
+    parser.add_argument("--save", help="Write the results to this baseline JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file to compare against, exit code 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Throughput drop that counts as a regression (default 0.2 = 20%%)")
+    parser.add_argument("--min-ms", type=float, default=0.2, help="Ignore groups faster than this in the baseline, too noisy (default 0.2)")
+    parser.add_argument("--keep-files", help="Write the synthetic files into this folder and keep them")
+    args = parser.parse_args(argv)
+
+    baseline = load_baseline(args.compare) if args.compare else None
+    if baseline is not None and baseline["machine"] != machine_info():
+        print(f"Warning: baseline made on {baseline['machine']}, timings may not be comparable")
+    if args.keep_files:
+        os.makedirs(args.keep_files, exist_ok=True)
+    results = run(args.cases, args.scale, args.repeat, args.keep_files)
+    print_results(results, baseline)
+    if args.save:
+        with open(args.save, "w", encoding='utf-8') as f:
+            json.dump(results, f, indent=1)
+        print(f"Saved baseline to {args.save}")
+    if baseline is None:
+        return 0
+    regressions = compare(results, baseline, args.threshold, args.min_ms)
+    for name, group, old_mb_s, mb_s, drop in regressions:
+        print(f"REGRESSION {name} {group}: {old_mb_s} -> {mb_s} MB/s ({drop:.0%} slower)")
+    if regressions:
+        return 1
+    print(f"No regressions over {args.threshold:.0%}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,39 +1,263 @@
 import bpy
-import bmesh
+import hashlib
+import os
+import numpy as np
+from mathutils import Matrix
+from .d3dmesh import D3DMesh, D3DMaterial, mesh_parts, skin_groups
+from .skl import D3DSkeleton, world_matrices, bone_lengths
+from .textures import TextureLoader
+from .profiling import ImportProfile, profile_stage
+
+# (hash1, hash2, texture names, with images) -> Blender material name, for the whole session,
+# so files sharing a Telltale material share one Blender material
+_material_cache = {}
+
+class MeshInstances:
+    """
+    Shares one Blender mesh between every part with the same content
+
+    A part is fingerprinted by a hash of everything its mesh is built
+    from: vertices, faces, UVs, normals, colors, skin weights and material
+    slots. A part seen before (the same prop under another file name, or
+    the same file imported again) becomes a new object linking the mesh
+    built the first time, like Alt+D. Vertex weights live in the mesh, so
+    the new object only needs the vertex group names.
+    Make one per import (or batch chunk) and hand it to every build of it,
+    separate imports don't share meshes
+    """
+
+    def __init__(self):
+        self.meshes = {}    # content hash -> (Blender mesh name, its vertex group names in order)
+        self.built = 0
+        self.instanced = 0
+        self.saved_bytes = 0
+
+    @staticmethod
+    def fingerprint(arrays : dict, labels = ()) -> str:
+        """Hash of named arrays (None = missing) and strings"""
+        h = hashlib.blake2b(digest_size=16)
+        for label in labels:
+            h.update(f"{label}\0".encode())
+        for name, values in arrays.items():
+            if values is None:
+                continue
+            values = np.ascontiguousarray(values)
+            h.update(f"{name} {values.dtype.str} {values.shape}\0".encode())
+            h.update(values.data)
+        return h.hexdigest()
+
+    def instance(self, key : str, name : str, nbytes : int = 0) -> bpy.types.Object:
+        """New object for the mesh built for key, None if there's none (anymore)"""
+        mesh_name, group_names = self.meshes.get(key, (None, ()))
+        m = bpy.data.meshes.get(mesh_name) if mesh_name is not None else None
+        # Deleted, or another mesh took its name
+        if m is None or m.get("d3dmesh_hash") != key:
+            return None
+        mo = bpy.data.objects.new(name, m)
+        for group_name in group_names:
+            mo.vertex_groups.new(name=group_name)
+        self.instanced += 1
+        self.saved_bytes += nbytes
+        return mo
+
+    def add(self, key : str, obj : bpy.types.Object):
+        """Remember the mesh of a newly built object"""
+        obj.data["d3dmesh_hash"] = key
+        self.meshes[key] = (obj.data.name, tuple(vg.name for vg in obj.vertex_groups))
+        self.built += 1
+
+    def summary(self) -> str:
+        return f"{self.built} built, {self.instanced} instanced ({self.saved_bytes / (1 << 20):.1f} MB not duplicated)"
 
 def buildModel(name, 
                verts, 
                faces, 
-               uvs=[], 
-               bones=[], 
-               weights=[], 
-               colors=[],
+               uvs={}, 
+               vertex_groups={}, 
+               normals=None,
+               colors={},
+               materials=[],
+               material_indices=None,
                verbose=False,
-               offset_face_idxs = 0) -> bpy.types.Object: 
-    m = bpy.data.meshes.new(name)
-    
-    if offset_face_idxs != 0:
-        offset_faces = []
-        for f in faces:
-            new_f = []
-            for fv in f:
-                new_f.append(fv+offset_face_idxs)
-            offset_faces.append(new_f)
-        faces = offset_faces
-    
-    m.from_pydata(verts, [], faces)
-
-    bm = bmesh.new()
-    bm.from_mesh(m)
-    
-    for v in bm.verts:
-        if len(v.link_edges) == 0:
-            bm.verts.remove(v)
-    
-    bm.to_mesh(m)
-    m.update()
-    mo = bpy.data.objects.new(name,m)
+               profile : ImportProfile = None) -> bpy.types.Object: 
+    with profile_stage(profile, "Build: Blender mesh") as stage:
+        m = bpy.data.meshes.new(name)
+        
+        # Flat buffers straight into the mesh, no per-face Python objects
+        co = np.ascontiguousarray(verts, dtype=np.float32).reshape(-1)
+        loop_verts = np.ascontiguousarray(faces, dtype=np.int32).reshape(-1)
+        stage.nbytes = co.nbytes + loop_verts.nbytes
+        m.vertices.add(len(co) // 3)
+        m.vertices.foreach_set("co", co)
+        m.loops.add(len(loop_verts))
+        m.loops.foreach_set("vertex_index", loop_verts)
+        m.polygons.add(len(loop_verts) // 3)
+        m.polygons.foreach_set("loop_start", np.arange(0, len(loop_verts), 3, dtype=np.int32))
+        # Per-vertex UVs to per-loop with one gather by the index buffer
+        for uv_name, uv in uvs.items():
+            uv_layer = m.uv_layers.new(name=uv_name, do_init=False)
+            loop_uvs = np.ascontiguousarray(uv, dtype=np.float32)[loop_verts].reshape(-1)
+            stage.nbytes += loop_uvs.nbytes
+            uv_layer.data.foreach_set("uv", loop_uvs)
+        for mat in materials:
+            m.materials.append(mat)
+        if material_indices is not None:
+            m.polygons.foreach_set("material_index", np.ascontiguousarray(material_indices, dtype=np.int32))
+        m.update(calc_edges=True)
+        if normals is not None:
+            # Vertices are the game's split vertices, so per-vertex custom normals keep its hard edges
+            m.normals_split_custom_set_from_vertices(np.ascontiguousarray(normals, dtype=np.float32).reshape(-1, 3))
+        for color_name, rgba in colors.items():
+            attr = m.color_attributes.new(name=color_name, type='BYTE_COLOR', domain='POINT')
+            attr.data.foreach_set("color_srgb", (np.asarray(rgba, dtype=np.float32) / 255).reshape(-1))
+        mo = bpy.data.objects.new(name,m)
+    # One add() per (bone, weight) run instead of one per influence
+    with profile_stage(profile, "Build: vertex groups") as stage:
+        for group_name, runs in vertex_groups.items():
+            vg = mo.vertex_groups.get(group_name) or mo.vertex_groups.new(name=group_name)
+            for weight, vert_ids in runs:
+                stage.nbytes += 4 * len(vert_ids)
+                vg.add(vert_ids, weight, 'ADD')
     return mo
 
-def buildSkeleton(name, bones) -> bpy.types.Object:
-    pass
\ No newline at end of file
+def buildMaterial(mat : D3DMaterial, textures : TextureLoader = None, texture_dirs = ()) -> bpy.types.Material:
+    """Principled material for a Telltale material, with its textures when a loader is given"""
+    name = mat.diffuse_name if mat.diffuse_name != "undefined" else f"{mat.hash1:x}{mat.hash2:x}"
+    bm = bpy.data.materials.new(name)
+    bm.use_nodes = True
+    nodes = bm.node_tree.nodes
+    links = bm.node_tree.links
+    bsdf = nodes.get("Principled BSDF")
+    if textures is None or bsdf is None:
+        return bm
+    for i, ((tex_type, tex_subtype, tex_key), tex_name) in enumerate(zip(mat.textures, mat.texture_names)):
+        node = nodes.new("ShaderNodeTexImage")
+        node.label = f"{tex_type} {tex_subtype}"
+        node.location = (-700, 300 - 300 * i)
+        node.image = textures.image(tex_key, tex_name, texture_dirs)
+        match tex_type:
+            case "Diffuse" if not bsdf.inputs["Base Color"].is_linked:
+                links.new(node.outputs["Color"], bsdf.inputs["Base Color"])
+            case "Normal" if not bsdf.inputs["Normal"].is_linked:
+                if node.image is not None:
+                    node.image.colorspace_settings.name = 'Non-Color'
+                normal_map = nodes.new("ShaderNodeNormalMap")
+                normal_map.location = (-300, -300)
+                links.new(node.outputs["Color"], normal_map.inputs["Color"])
+                links.new(normal_map.outputs["Normal"], bsdf.inputs["Normal"])
+            case "Emission" if not bsdf.inputs["Emission Color"].is_linked:
+                links.new(node.outputs["Color"], bsdf.inputs["Emission Color"])
+    return bm
+
+def getMaterial(mat : D3DMaterial, textures : TextureLoader = None, texture_dirs = ()) -> bpy.types.Material:
+    """Cached buildMaterial, rebuilt only if the cached one was deleted or renamed"""
+    key = (mat.hash1, mat.hash2, tuple(mat.texture_names), textures is not None)
+    name = _material_cache.get(key)
+    bm = bpy.data.materials.get(name) if name is not None else None
+    if bm is None:
+        bm = buildMaterial(mat, textures, texture_dirs)
+        _material_cache[key] = bm.name
+    return bm
+
+def buildD3DMesh(mesh : D3DMesh,
+                 parse_lods = False,
+                 join_submeshes = True,
+                 uv_layers = 'MERGE',
+                 parse_materials = False,
+                 textures : TextureLoader = None,
+                 texture_dirs = (),
+                 lods = None,
+                 profile : ImportProfile = None,
+                 instances : MeshInstances = None,
+                 ) -> list[bpy.types.Object]:
+    """
+    Create the (unlinked) objects for a parsed mesh
+
+    With parse_materials every object gets a slot per Section 5 material
+    group its faces use, with images from textures (None = no textures),
+    found through its index or in texture_dirs.
+    lods picks the LOD numbers to build instead of parse_lods.
+    profile (an ImportProfile) gets a stage per build step.
+    With instances, parts whose content was built before link that mesh
+    instead of getting their own
+    """
+    objs = []
+    with profile_stage(profile, "Build: parts") as stage:
+        parts = list(mesh_parts(mesh, parse_lods, join_submeshes, uv_layers, lods))
+        stage.nbytes = sum(part.faces.nbytes + part.vert_ids.nbytes for part in parts)
+    for part in parts:
+        materials = []
+        material_indices = None
+        if parse_materials:
+            with profile_stage(profile, "Build: materials"):
+                slot_groups, material_indices = np.unique(part.face_groups, return_inverse=True)
+                for group in slot_groups.tolist():
+                    mat_index = mesh.material_groups[group] if 0 <= group < len(mesh.material_groups) else -1
+                    materials.append(getMaterial(mesh.materials[mat_index], textures, texture_dirs) if mat_index >= 0 else None)
+        with profile_stage(profile, "Build: gather") as stage:
+            verts = mesh.positions[part.vert_ids]
+            uvs = {name: mesh.uvs[name][part.vert_ids] for name in part.uvs}
+            normals = mesh.normals[part.vert_ids] if mesh.normals is not None else None
+            colors = {name: rgba[part.vert_ids] for name, rgba in mesh.colors.items()}
+            nbytes = (verts.nbytes + part.faces.nbytes + sum(uv.nbytes for uv in uvs.values())
+                      + sum(rgba.nbytes for rgba in colors.values()) + (normals.nbytes if normals is not None else 0))
+            stage.nbytes = nbytes
+        key = None
+        if instances is not None:
+            with profile_stage(profile, "Build: instancing", nbytes):
+                palette = mesh.lods[part.lod].bone_names
+                arrays = {"positions": verts, "faces": part.faces, "normals": normals,
+                          "bones": mesh.bones[part.vert_ids] if mesh.bones is not None and palette else None,
+                          "weights": mesh.weights[part.vert_ids] if mesh.weights is not None and palette else None,
+                          "material_indices": material_indices}
+                arrays.update((f"uv {name}", uv) for name, uv in uvs.items())
+                arrays.update((f"color {name}", rgba) for name, rgba in colors.items())
+                labels = [bm.name if bm is not None else "" for bm in materials] + ["bones"] + list(palette)
+                key = instances.fingerprint(arrays, labels)
+                obj = instances.instance(key, part.name, nbytes)
+            if obj is not None:
+                objs.append(obj)
+                continue
+        with profile_stage(profile, "Build: skin groups"):
+            vertex_groups = skin_groups(mesh, part)
+        obj = buildModel(part.name, verts, part.faces, uvs=uvs,
+                         vertex_groups=vertex_groups, normals=normals, colors=colors,
+                         materials=materials, material_indices=material_indices, profile=profile)
+        if key is not None:
+            instances.add(key, obj)
+        objs.append(obj)
+    return objs
+
+def buildSkeleton(skel : D3DSkeleton, collection : bpy.types.Collection) -> bpy.types.Object:
+    """
+    Armature object for a parsed skeleton, linked to collection (edit mode needs it in the scene)
+
+    Every bone is made in one edit mode session with its world rest matrix,
+    so bone space is the game's bone space and skinned meshes fit as they are
+    """
+    arm = bpy.data.armatures.new(skel.name)
+    obj = bpy.data.objects.new(skel.name, arm)
+    collection.objects.link(obj)
+    world = world_matrices(skel)
+    lengths = bone_lengths(skel, world)
+
+    view_layer = bpy.context.view_layer
+    previous = view_layer.objects.active
+    if bpy.context.mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode='OBJECT')
+    view_layer.objects.active = obj
+    bpy.ops.object.mode_set(mode='EDIT')
+    edit_bones = arm.edit_bones
+    bones = []
+    for name, matrix, length in zip(skel.bone_names, world.tolist(), lengths.tolist()):
+        eb = edit_bones.new(name)
+        # Matrix keeps the bone's length, which has to be set (non-zero) first
+        eb.tail = (0, length, 0)
+        eb.matrix = Matrix(matrix)
+        bones.append(eb)
+    for eb, parent in zip(bones, skel.parents.tolist()):
+        if parent >= 0:
+            eb.parent = bones[parent]
+    bpy.ops.object.mode_set(mode='OBJECT')
+    view_layer.objects.active = previous
+    return obj
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import numpy as np
+from .d3dmesh import D3DMesh, PARSER_VERSION, mesh_tables, mesh_from_tables, parse_d3dmesh, resolve_names
+from .profiling import ImportProfile, profile_stage
+
+# On-disk cache of parsed meshes
+#
+# entries/<sha1 of the .d3dmesh>-v<PARSER_VERSION>.npz
+#     every array field of the D3DMesh as is, plus its tables (materials,
+#     LODs, submeshes, header values) as one JSON string
+# paths/<sha1 of the absolute path>.json
+#     size, mtime and content hash of that file when it was last seen, so
+#     unchanged files don't have to be hashed again
+#
+# Everything is written to a temp file and renamed into place, which keeps
+# the cache usable from several processes (batch workers) at once.
+# Hits touch their entry's mtime; once the entries add up to more than
+# max_bytes the least recently used ones are deleted
+
+DEFAULT_DIR = os.path.join(os.path.dirname(__file__), "ParseCache")
+DEFAULT_MAX_MB = 1024
+
+def file_sha1(path : str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _write_atomic(path : str, write):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+def mesh_to_arrays(mesh : D3DMesh) -> dict:
+    """D3DMesh -> {name: array} for np.savez, tables go into a JSON string under "meta" """
+    tables, arrays = mesh_tables(mesh)
+    arrays["meta"] = np.frombuffer(json.dumps(tables).encode('utf-8'), dtype=np.uint8)
+    return arrays
+
+def mesh_from_arrays(data) -> D3DMesh:
+    """Inverse of mesh_to_arrays"""
+    return mesh_from_tables(json.loads(bytes(data["meta"]).decode('utf-8')), data)
+
+class MeshCache:
+    """Parsed D3DMesh cache in cache_dir, capped at max_bytes"""
+
+    def __init__(self, cache_dir : str = None, max_bytes : int = DEFAULT_MAX_MB << 20):
+        self.cache_dir = cache_dir or DEFAULT_DIR
+        self.max_bytes = max_bytes
+        self.entries_dir = os.path.join(self.cache_dir, "entries")
+        self.paths_dir = os.path.join(self.cache_dir, "paths")
+        self.hits = 0
+        self.misses = 0
+
+    def _path_record(self, path : str) -> str:
+        return os.path.join(self.paths_dir, hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest() + ".json")
+
+    def _entry_path(self, content_hash : str) -> str:
+        return os.path.join(self.entries_dir, f"{content_hash}-v{PARSER_VERSION}.npz")
+
+    def content_hash(self, path : str) -> str:
+        """SHA-1 of the file, reused from the last visit while size and mtime are unchanged"""
+        st = os.stat(path)
+        record_path = self._path_record(path)
+        try:
+            with open(record_path, "r") as f:
+                record = json.load(f)
+            if record["size"] == st.st_size and record["mtime_ns"] == st.st_mtime_ns:
+                return record["sha1"]
+        except (OSError, ValueError, KeyError):
+            pass
+        sha1 = file_sha1(path)
+        os.makedirs(self.paths_dir, exist_ok=True)
+        record = json.dumps({"path": os.path.abspath(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha1": sha1})
+        _write_atomic(record_path, lambda f: f.write(record.encode('utf-8')))
+        return sha1
+
+    def get(self, path : str) -> D3DMesh:
+        """Cached parse of path, None on a miss"""
+        entry = self._entry_path(self.content_hash(path))
+        try:
+            with np.load(entry) as data:
+                mesh = mesh_from_arrays(data)
+            os.utime(entry)
+        except (OSError, ValueError, KeyError, TypeError):
+            # Missing, half-deleted by another process's eviction, or from an incompatible layout
+            self.misses += 1
+            return None
+        self.hits += 1
+        return mesh
+
+    def put(self, path : str, mesh : D3DMesh) -> None:
+        os.makedirs(self.entries_dir, exist_ok=True)
+        arrays = mesh_to_arrays(mesh)
+        _write_atomic(self._entry_path(self.content_hash(path)), lambda f: np.savez(f, **arrays))
+        self.evict()
+
+    def evict(self) -> int:
+        """Delete least recently used entries until the cache fits max_bytes, returns bytes freed"""
+        entries = []
+        with os.scandir(self.entries_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".npz"):
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime_ns, st.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        freed = 0
+        for _, size, entry_path in sorted(entries):
+            if total - freed <= self.max_bytes:
+                break
+            try:
+                os.remove(entry_path)
+            except OSError:
+                continue
+            freed += size
+        return freed
+
+    def clear(self) -> None:
+        for folder in (self.entries_dir, self.paths_dir):
+            if not os.path.isdir(folder):
+                continue
+            for name in os.listdir(folder):
+                try:
+                    os.remove(os.path.join(folder, name))
+                except OSError:
+                    pass
+
+    def size(self) -> int:
+        """Total size of the cached entries in bytes"""
+        if not os.path.isdir(self.entries_dir):
+            return 0
+        with os.scandir(self.entries_dir) as it:
+            return sum(entry.stat().st_size for entry in it if entry.name.endswith(".npz"))
+
+    def summary(self) -> str:
+        return f"{self.hits} cached, {self.misses} parsed"
+
+def load_d3dmesh(filepath, cache : MeshCache = None, verbose = False, tex_names = None, bone_names = None, trace_path = None,
+                 profile : ImportProfile = None) -> D3DMesh:
+    """parse_d3dmesh through the cache (when given), names are resolved either way"""
+    if cache is None:
+        return parse_d3dmesh(filepath, verbose=verbose, tex_names=tex_names, bone_names=bone_names, trace_path=trace_path, profile=profile)
+    with profile_stage(profile, "Cache lookup"):
+        mesh = cache.get(filepath)
+    if mesh is not None:
+        if verbose: print(f"Using cached parse of {filepath}")
+        with profile_stage(profile, "Name lookup"):
+            resolve_names(mesh, tex_names, bone_names, verbose)
+        return mesh
+    mesh = parse_d3dmesh(filepath, verbose=verbose, tex_names=tex_names, bone_names=bone_names, trace_path=trace_path, profile=profile)
+    if mesh is not None:
+        with profile_stage(profile, "Cache store"):
+            cache.put(filepath, mesh)
+    return mesh
@@ -0,0 +1,254 @@
+"""
+Metadata index of whole extracted game folders
+
+Every .d3dmesh is probed (header up to Section 12, no vertex or index
+data) in a process pool and the results go into a SQLite database, which
+can then be searched without touching the files again. Unchanged files
+(same size and mtime) are skipped when a folder is indexed again
+
+Index a folder, optionally also writing everything out as JSON:
+    python -m <addon_package>.catalog index <folder> --db <meshes.sqlite> [--json <meshes.json>]
+
+Search it, e.g. every skinned mesh over 20k triangles using a material:
+    python -m <addon_package>.catalog find --db <meshes.sqlite> --skinned --min-tris 20000 --material <hash>
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .batch import discover, pool_function, time_limit
+
+# Seconds probing one file may take before it counts as failed (it normally takes about a millisecond)
+PROBE_TIMEOUT = 10
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meshes (
+    path TEXT PRIMARY KEY,
+    size INTEGER,
+    mtime_ns INTEGER,
+    name TEXT,
+    version INTEGER,
+    verts INTEGER,
+    tris INTEGER,
+    lods INTEGER,
+    submeshes INTEGER,
+    lod_tris TEXT,
+    skinned INTEGER,
+    bbox_min TEXT,
+    bbox_max TEXT,
+    formats TEXT,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS mesh_materials (
+    path TEXT,
+    material TEXT,
+    PRIMARY KEY (path, material)
+);
+CREATE INDEX IF NOT EXISTS mesh_materials_material ON mesh_materials (material);
+"""
+
+def _probe_file(path : str) -> dict:
+    """Worker: probe one file into a row, never raises (or takes longer than PROBE_TIMEOUT)"""
+    import io, contextlib
+    from .d3dmesh import probe
+    row = {"path": path, "size": None, "mtime_ns": None, "materials": [], "error": None}
+    try:
+        # Deleted or unreadable since it was found: a failed row (size/mtime NULL), not a failed index
+        st = os.stat(path)
+        row.update(size=st.st_size, mtime_ns=st.st_mtime_ns)
+        with time_limit(PROBE_TIMEOUT), contextlib.redirect_stdout(io.StringIO()):
+            info = probe(path)
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+        return row
+    if info is None:
+        row["error"] = "unsupported version or no geometry"
+        return row
+    row.update(name=info.name, version=info.version, verts=info.vert_count, tris=info.tri_count,
+               lods=info.lod_count, submeshes=info.submesh_count, lod_tris=info.lod_tri_counts,
+               skinned=info.skinned, bbox_min=info.bbox_min, bbox_max=info.bbox_max,
+               formats=info.formats, materials=info.materials)
+    return row
+
+def probe_all(paths : list[str], jobs : int = None):
+    """Probe files across a process pool, yields rows in order"""
+    if jobs == 1:
+        for path in paths:
+            yield _probe_file(path)
+        return
+    worker = pool_function("catalog", "_probe_file")
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        # Probing takes about a millisecond, so hand files out in chunks
+        yield from pool.map(worker, paths, chunksize=64)
+
+class MeshCatalog:
+    """SQLite index of probed .d3dmesh files"""
+
+    json_columns = ("lod_tris", "bbox_min", "bbox_max", "formats")
+
+    def __init__(self, db_path : str):
+        self.db_path = db_path
+        self.db = sqlite3.connect(db_path)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def update(self, paths : list[str], jobs : int = None, verbose = False) -> dict:
+        """Index every .d3dmesh under paths, returns counts of what happened"""
+        found = [os.path.abspath(path) for path in discover(paths)]
+        known = {row["path"]: (row["size"], row["mtime_ns"]) for row in self.db.execute("SELECT path, size, mtime_ns FROM meshes")}
+        todo = []
+        for path in found:
+            try:
+                st = os.stat(path)
+            except OSError:
+                # Gone already, the probe records why
+                todo.append(path)
+                continue
+            if known.get(path) != (st.st_size, st.st_mtime_ns):
+                todo.append(path)
+        # Files that were under the indexed folders but are gone now
+        roots = [os.path.abspath(path) for path in paths]
+        found_set = set(found)
+        gone = [path for path in known
+                if path not in found_set and any(path == root or path.startswith(root + os.sep) for root in roots)]
+
+        start = time.perf_counter()
+        failed = 0
+        with self.db:
+            for path in gone:
+                self._delete(path)
+            for done, row in enumerate(probe_all(todo, jobs), 1):
+                self._delete(row["path"])
+                self._insert(row)
+                if row["error"]:
+                    failed += 1
+                    if verbose: print(f"FAIL {row['path']}: {row['error']}")
+                if verbose and done % 1000 == 0:
+                    print(f"[{done}/{len(todo)}] probed")
+        return {"found": len(found), "probed": len(todo), "failed": failed, "removed": len(gone),
+                "seconds": time.perf_counter() - start}
+
+    def _delete(self, path : str):
+        self.db.execute("DELETE FROM meshes WHERE path = ?", (path,))
+        self.db.execute("DELETE FROM mesh_materials WHERE path = ?", (path,))
+
+    def _insert(self, row : dict):
+        values = dict(row)
+        for column in self.json_columns:
+            if values.get(column) is not None:
+                values[column] = json.dumps(values[column])
+        columns = ("path", "size", "mtime_ns", "name", "version", "verts", "tris", "lods", "submeshes",
+                   "lod_tris", "skinned", "bbox_min", "bbox_max", "formats", "error")
+        self.db.execute(f"INSERT INTO meshes ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                        [values.get(column) for column in columns])
+        self.db.executemany("INSERT OR IGNORE INTO mesh_materials (path, material) VALUES (?, ?)",
+                            [(row["path"], material) for material in row["materials"]])
+
+    def find(self,
+             min_tris : int = None,
+             max_tris : int = None,
+             min_verts : int = None,
+             skinned : bool = None,
+             material : str = None,
+             name : str = None,
+             attribute : str = None,
+             failed = False) -> list[dict]:
+        """Rows matching every given filter (name is a glob, attribute a stream name like "Normals"), largest first"""
+        where = ["error IS NOT NULL" if failed else "error IS NULL"]
+        params = []
+        if min_tris is not None:
+            where.append("tris >= ?"); params.append(min_tris)
+        if max_tris is not None:
+            where.append("tris <= ?"); params.append(max_tris)
+        if min_verts is not None:
+            where.append("verts >= ?"); params.append(min_verts)
+        if skinned is not None:
+            where.append("skinned = ?"); params.append(int(skinned))
+        if material is not None:
+            where.append("path IN (SELECT path FROM mesh_materials WHERE material = ?)"); params.append(material.lower())
+        if name is not None:
+            where.append("name GLOB ?"); params.append(name)
+        if attribute is not None:
+            where.append("instr(formats, ?) > 0"); params.append(json.dumps(attribute) + ":")
+        rows = self.db.execute(f"SELECT * FROM meshes WHERE {' AND '.join(where)} ORDER BY tris DESC, path", params)
+        return [self._row(row) for row in rows]
+
+    def _row(self, row : sqlite3.Row) -> dict:
+        result = dict(row)
+        for column in self.json_columns:
+            if result[column] is not None:
+                result[column] = json.loads(result[column])
+        result["skinned"] = bool(result["skinned"])
+        result["materials"] = [m for (m,) in self.db.execute("SELECT material FROM mesh_materials WHERE path = ?", (row["path"],))]
+        return result
+
+    def export_json(self, path : str) -> int:
+        """Write every indexed file (failed ones included) to a JSON list, returns how many"""
+        rows = self.find() + self.find(failed=True)
+        with open(path, "w", encoding='utf-8') as f:
+            json.dump(rows, f, indent=1)
+        return len(rows)
+
+def main(argv = None) -> int:
+    parser = argparse.ArgumentParser(prog="catalog", description="Index and search Telltale .d3dmesh metadata")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    index = commands.add_parser("index", help="Probe every .d3dmesh under folders into the database")
+    index.add_argument("paths", nargs="+", help="Folders (searched recursively) and/or files")
+    index.add_argument("--db", required=True, help="SQLite database to create or update")
+    index.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes (default: CPU count, 1 = no pool)")
+    index.add_argument("--json", help="Also write the whole index to this JSON file")
+    index.add_argument("-v", "--verbose", action="store_true", help="Print failures and progress")
+
+    find = commands.add_parser("find", help="List indexed meshes matching every given filter")
+    find.add_argument("--db", required=True, help="SQLite database made by index")
+    find.add_argument("--min-tris", type=int)
+    find.add_argument("--max-tris", type=int)
+    find.add_argument("--min-verts", type=int)
+    find.add_argument("--skinned", action="store_true", default=None, help="Only meshes with skin weights/bones")
+    find.add_argument("--static", dest="skinned", action="store_false", help="Only meshes without skin weights/bones")
+    find.add_argument("--material", help="Material hash (hash1 then hash2, 16 hex digits)")
+    find.add_argument("--name", help="Mesh name glob, e.g. 'sk54_*'")
+    find.add_argument("--attribute", help="Vertex stream the mesh must have, e.g. Normals, UV2, Colors")
+    find.add_argument("--failed", action="store_true", help="List files that couldn't be probed instead")
+    find.add_argument("--json", action="store_true", help="Print the matches as JSON")
+    args = parser.parse_args(argv)
+
+    with MeshCatalog(args.db) as catalog:
+        match args.command:
+            case "index":
+                stats = catalog.update(args.paths, args.jobs, args.verbose)
+                print(f"{stats['found']} files, {stats['probed']} probed in {stats['seconds']:.1f} s "
+                      f"({stats['failed']} failed), {stats['removed']} removed")
+                if args.json:
+                    print(f"Wrote {catalog.export_json(args.json)} entries to {args.json}")
+            case "find":
+                rows = catalog.find(args.min_tris, args.max_tris, args.min_verts, args.skinned,
+                                    args.material, args.name, args.attribute, args.failed)
+                if args.json:
+                    print(json.dumps(rows, indent=1))
+                else:
+                    for row in rows:
+                        if row["error"]:
+                            print(f"{row['path']}: {row['error']}")
+                        else:
+                            print(f"{row['path']}  {row['tris']} tris, {row['verts']} verts, {row['lods']} LODs{', skinned' if row['skinned'] else ''}")
+                    print(f"{len(rows)} matches")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1259 @@
+"""
+Blender-independent .d3dmesh parser
+
+parse_d3dmesh reads a whole file into a D3DMesh: header info, materials,
+per-LOD submesh tables and the vertex/index buffers as NumPy arrays.
+Nothing here imports bpy, so it runs in worker processes and plain Python
+"""
+
+import dataclasses
+import logging
+from dataclasses import dataclass, field
+from .wbr import WBR
+from .hashdb import NameResolver
+from .trace import RECORD, Tracer, console_logging
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+# Bump whenever parse_d3dmesh's output changes, so cached parses get thrown away
+PARSER_VERSION = 7
+
+@dataclass(slots=True)
+class D3DMaterial:
+    hash1 : int
+    hash2 : int
+    # (type, subtype, texture hash key) per texture param, names come from the NameResolver
+    textures : list = field(default_factory=list)
+    diffuse_name : str = "undefined"
+    texture_names : list = field(default_factory=list)  # resolved by resolve_names, parallel to textures
+
+@dataclass(slots=True)
+class D3DSubmesh:
+    """One entry of a LOD's Section 3A table, all indices 0-based"""
+    lod : int
+    vertex_start : int      # added to every index of this submesh
+    vertex_min : int
+    vertex_max : int
+    polygon_start : int     # first triangle in the index buffer
+    polygon_count : int
+    face_point_count : int
+    mat_num : int
+    bbox_min : tuple
+    bbox_max : tuple
+
+@dataclass(slots=True)
+class D3DLod:
+    submeshes : list        # D3DSubmesh
+    bone_hashes : list      # Section 3D (hash1, hash2) keys, what skin bone indices point into
+    bone_ids_offset : int
+    bbox_min : tuple
+    bbox_max : tuple
+    bone_names : list = field(default_factory=list)  # bone_hashes resolved by resolve_names
+
+@dataclass(slots=True)
+class D3DMesh:
+    name : str
+    version : int
+    file_size : int
+    materials : list        # D3DMaterial
+    lods : list             # D3DLod
+    bbox_min : tuple        # Section 10 position clamps
+    bbox_max : tuple
+    orient : str
+    vert_count : int
+    vert_flags : int
+    uv_mults : list
+    uv_starts : list
+    formats : dict          # vertex attribute name -> format number, as listed in Section 12
+    positions : np.ndarray  # (N,3) float32
+    faces : np.ndarray      # (T,3) index buffer A
+    faces_b : np.ndarray    # (T,3) index buffer B
+    uvs : dict = field(default_factory=dict)    # "UV1".."UV6" -> (N,2) float32, V already flipped
+    weights : np.ndarray = None # (N,4) float32 skin weights
+    bones : np.ndarray = None   # (N,4) uint8 indices into the LOD's bone_hashes
+    normals : np.ndarray = None     # (N,3) float32, not normalized
+    tangents : np.ndarray = None    # (N,4) float32
+    binormals : np.ndarray = None   # (N,4) float32
+    colors : dict = field(default_factory=dict) # "Colors"/"Colors2" -> (N,4) uint8 RGBA
+    material_groups : list = field(default_factory=list)    # Section 5, what submesh mat_num indexes: index into materials, -1 if unknown
+    # Where the buffers sit in the file, so single LODs can be read again later (load_lod)
+    index_offset : int = 0
+    index_size : int = 2
+    stream_offsets : dict = field(default_factory=dict) # "Vertex", stream names and "Interleaved" (0x31 buffer) -> file offset
+
+    @property
+    def submeshes(self) -> list:
+        return [sm for lod in self.lods for sm in lod.submeshes]
+
+@dataclass(slots=True)
+class D3DMeshInfo:
+    """What probe reads: everything up to Section 12, no vertex or index data"""
+    path : str
+    name : str
+    version : int
+    file_size : int
+    vert_count : int
+    tri_count : int         # index buffer A
+    lod_count : int
+    submesh_count : int     # all LODs
+    lod_tri_counts : list   # triangles per LOD
+    materials : list        # "hash1hash2" hex string per material
+    bbox_min : tuple
+    bbox_max : tuple
+    formats : dict
+    skinned : bool
+
+@dataclass(slots=True)
+class MeshPart:
+    """Geometry for one object: a slice of the shared vertex pool and its faces"""
+    name : str
+    lod : int
+    submeshes : list        # indices into D3DMesh.submeshes
+    vert_ids : np.ndarray   # indices into D3DMesh.positions
+    faces : np.ndarray      # (T,3) indices into vert_ids
+    uvs : tuple = ()        # D3DMesh.uvs layers this object gets
+    face_groups : np.ndarray = None # (T,) mat_num of every face
+
+# Bytes per vertex for each supported position format
+position_strides = {
+    4 : 12, # 3x float32
+    27: 8,  # 4x unorm16 (xyz + unused q), scaled by mesh bounds
+    42: 4,  # 10:10:10:2 packed, scaled by mesh bounds
+}
+
+# Bytes per vertex of every known stream format, to step over streams that aren't decoded
+format_strides = {
+    3 : 8,  # 2x float32
+    4 : 12, # 3x float32
+    24: 4,  # 2x snorm16
+    25: 4,  # 2x unorm16
+    26: 8,  # 4x snorm16
+    27: 8,  # 4x unorm16
+    33: 4,  # 4x uint8
+    38: 4,  # 4x snorm8
+    39: 4,  # 4x unorm8
+    42: 4,  # 10:10:10:2 packed
+}
+
+# Interleaved buffer of VertFlags 0x31 meshes, one 24 byte record per vertex:
+# position (duplicate of the Vertex stream?), 4 bone indices and 8 bytes of weights (not decoded)
+_INTERLEAVED_DTYPE = np.dtype([('pos', '<f4', 3), ('bones', 'u1', 4), ('unk', 'V8')])
+
+# Order the vertex streams follow the positions in, regardless of their order in Section 12
+stream_order = ("Weights", "Bones", "Normals", "Tangents", "Binormals", "UV5", "UV6",
+                "Colors", "Colors2", "UV1", "UV2", "UV3", "UV4")
+
+uv_layer_names = ("UV1", "UV2", "UV3", "UV4", "UV5", "UV6")
+
+# Section 12 (VertType, VertLayer) -> vertex attribute
+stream_names = {
+    (1,1): "Vertex",
+    (4,1): "Weights",
+    (5,1): "Bones",
+    (2,1): "Normals",
+    (3,1): "Tangents",
+    (2,2): "Binormals",
+    (7,5): "UV5",
+    (7,6): "UV6",
+    (6,1): "Colors",
+    (6,2): "Colors2",
+    (7,1): "UV1",
+    (7,2): "UV2",
+    (7,3): "UV3",
+    (7,4): "UV4",
+}
+
+@dataclass(slots=True, frozen=True)
+class MatParamLayout:
+    """How to read one material parameter block: count records of dtype, or just a seek"""
+    name : str
+    dtype : np.dtype = None     # record layout, None for blocks that are only seek fix-ups
+    seek : int = 0              # relative seek right after the count, when dtype is None
+
+def _records(*fields) -> np.dtype:
+    """Packed record of (name, type[, shape]) fields"""
+    return np.dtype(list(fields))
+
+_hash_pair = (("hash2", "<u4"), ("hash1", "<u4"))
+
+# (MatSectHash1, MatSectHash2) -> parameter layout
+# New layouts are added here, parse_d3dmesh reads every block with one readArray
+_mat_param_layouts = {
+    ("264ac2f2", "544e517c"): MatParamLayout("Fix adv_boardingSchoolExterior_meshesABuilding", seek=-0x04),
+    ("873c2f18", "35428297"): MatParamLayout("Fix obj_vehicleTruckForestShack", seek=0x08),
+    ("4e7d91f1", "6f97a3c2"): MatParamLayout("Fix ui_icon", seek=-0x04),
+    ("fec9ffdf", "25b43917"): MatParamLayout("Fix ui_mask", seek=-0x04),
+    ("b76e07d6", "bb899bfe"): MatParamLayout("Hash + 4 floats", _records(*_hash_pair, ("values", "<f4", 4))),
+    ("4f0234",   "63d89fb0"): MatParamLayout("4 longs", _records(("values", "<u4", 4))),
+    ("bae4cbd7", "7f139a91"): MatParamLayout("Hash + float", _records(*_hash_pair, ("value", "<f4"))),
+    ("9004c558", "7575d6c0"): MatParamLayout("Hash + byte", _records(*_hash_pair, ("value", "u1"))),
+    ("394c43af", "4ff52c94"): MatParamLayout("Hash + 3 floats", _records(*_hash_pair, ("values", "<f4", 3))),
+    ("7bbca244", "e61f1a07"): MatParamLayout("Hash + 2 floats", _records(*_hash_pair, ("values", "<f4", 2))),
+    ("c16762f7", "763d62ab"): MatParamLayout("Hash + 4 floats", _records(*_hash_pair, ("values", "<f4", 4))),
+    ("e2ba743e", "952f9338"): MatParamLayout("Hash sets", _records(("values", "<u4", 6))),
+    ("52a09151", "f1c3f2c7"): MatParamLayout("Textures", _records(("type_hash2", "<u4"), ("type_hash1", "<u4"),
+                                                                   ("tex_hash2", "<u4"), ("tex_hash1", "<u4"))),
+}
+
+# Same, keyed by the 64-bit (hash1 << 32) | hash2 the parser builds
+mat_param_layouts = {(int(h1, 16) << 32) | int(h2, 16): layout for (h1, h2), layout in _mat_param_layouts.items()}
+
+def decode_positions(f : WBR, fmt : int, count : int, mesh_min, mesh_mult, orient = "Q"):
+    """
+    Decode a whole position stream at the reader's cursor into an (N,3) float32 array
+
+    Arithmetic is done in float64 in the same order as the per-vertex
+    reference decoder, so results match it exactly once stored as float32
+    """
+    match fmt:
+        case 4:
+            return f.readArray('<f4', count*3).reshape(count, 3).astype(np.float32)
+        case 27:
+            xyz = f.readArray('<u2', count*4).reshape(count, 4)[:, :3] / 65535
+        case 42:
+            packed = f.readArray('<u4', count)
+            xyz = np.empty((count, 3), dtype=np.float64)
+            for axis in range(3):
+                xyz[:, axis] = ((packed >> (10*axis)) & 0x3FF) / 1023
+            # Upper 2 bits select a quarter of the range along the mesh's orientation axis
+            if orient in ("X", "Y", "Z"):
+                axis = "XYZ".index(orient)
+                xyz[:, axis] = xyz[:, axis] / 4 + (packed >> 30) / 4
+        case _:
+            raise ValueError(f"Unknown position format {fmt}")
+    xyz *= np.asarray(mesh_mult, dtype=np.float64)
+    xyz += np.asarray(mesh_min, dtype=np.float64)
+    return xyz.astype(np.float32)
+
+def decode_uvs(f : WBR, fmt : int, count : int, uv_mult, uv_start):
+    """Decode a whole UV stream into an (N,2) float32 array, V flipped for Blender"""
+    match fmt:
+        case 3:
+            uv = f.readArray('<f4', count*2).reshape(count, 2).astype(np.float64)
+        case 24:
+            uv = f.readArray('<i2', count*2).reshape(count, 2) / 32767
+        case 25:
+            uv = f.readArray('<u2', count*2).reshape(count, 2) / 65535
+        case _:
+            raise ValueError(f"Unknown UV format {fmt}")
+    if fmt != 3:
+        uv *= np.asarray(uv_mult, dtype=np.float64)
+        uv += np.asarray(uv_start, dtype=np.float64)
+    uv[:, 1] = 1 - uv[:, 1]
+    return uv.astype(np.float32)
+
+def decode_weights(f : WBR, fmt : int, count : int):
+    """Decode a whole skin weight stream into an (N,4) float32 array"""
+    match fmt:
+        case 27:
+            weights = f.readArray('<u2', count*4).reshape(count, 4) / 65535
+        case 42:
+            # 2:10:10:10 packed. Low to high bits: weight 2, 3 and 4 (each scaled to its
+            # possible range), the top 2 bits add steps of 1/8 to weight 2,
+            # and weight 1 is whatever is left of 1.0
+            packed = f.readArray('<u4', count)
+            weights = np.empty((count, 4), dtype=np.float64)
+            weights[:, 1] = ((packed & 0x3FF) / 1023) / 8 + (packed >> 30) / 8
+            weights[:, 2] = (((packed >> 10) & 0x3FF) / 1023) / 3
+            weights[:, 3] = (((packed >> 20) & 0x3FF) / 1023) / 4
+            weights[:, 0] = 1 - weights[:, 1] - weights[:, 2] - weights[:, 3]
+        case _:
+            raise ValueError(f"Unknown weights format {fmt}")
+    return weights.astype(np.float32)
+
+def decode_bones(f : WBR, fmt : int, count : int):
+    """Read a whole bone index stream as an (N,4) uint8 array"""
+    if fmt != 33:
+        raise ValueError(f"Unknown bones format {fmt}")
+    return np.array(f.readArray('u1', count*4).reshape(count, 4))
+
+def decode_snorm4(f : WBR, fmt : int, count : int):
+    """Decode a whole normal/tangent/binormal stream into an (N,4) float32 array"""
+    match fmt:
+        case 38:
+            return (f.readArray('i1', count*4).reshape(count, 4) / np.float32(127)).astype(np.float32)
+        case 26:
+            return (f.readArray('<i2', count*4).reshape(count, 4) / np.float32(32767)).astype(np.float32)
+        case _:
+            raise ValueError(f"Unknown normals format {fmt}")
+
+def decode_colors(f : WBR, fmt : int, count : int):
+    """Read a whole RGBA8 colour stream as an (N,4) uint8 array"""
+    if fmt not in (33, 39):
+        raise ValueError(f"Unknown colors format {fmt}")
+    return np.array(f.readArray('u1', count*4).reshape(count, 4))
+
+def decode_stream(f : WBR, stream : str, fmt : int, count : int, uv_mults, uv_starts):
+    """Decode `count` vertices of one of the streams in stream_order, None if its format isn't decoded"""
+    if stream == "Weights" and fmt in (27, 42):
+        return decode_weights(f, fmt, count)
+    if stream == "Bones" and fmt == 33:
+        return decode_bones(f, fmt, count)
+    if stream in ("Normals", "Tangents", "Binormals") and fmt in (26, 38):
+        return decode_snorm4(f, fmt, count)
+    if stream in ("Colors", "Colors2") and fmt in (33, 39):
+        return decode_colors(f, fmt, count)
+    if stream in uv_layer_names and fmt in (3, 24, 25):
+        layer = uv_layer_names.index(stream)
+        # (The MaxScript reference reads UV6 format 25 with UV5's V start, that's a typo there)
+        return decode_uvs(f, fmt, count, uv_mults[layer], uv_starts[layer])
+    return None
+
+def read_index_buffer(f : WBR, count : int, index_size = 2):
+    """Read `count` face points as a (count//3, 3) array of triangles"""
+    tri_count = count // 3
+    # Copied out of the mapping so a parsed mesh doesn't keep the file open
+    return np.array(f.readArray('<u4' if index_size == 4 else '<u2', tri_count * 3).reshape(tri_count, 3))
+
+def submesh_faces(faces, submeshes : list[D3DSubmesh]):
+    """
+    Every triangle of `submeshes` in one pass over the submesh table
+
+    Returns (tris, owner): the triangles sliced out of the index buffer and
+    offset by their submesh's vertex_start, and for every triangle the
+    position of its submesh in `submeshes`
+    """
+    starts = np.array([sm.polygon_start for sm in submeshes], dtype=np.int64)
+    counts = np.array([sm.polygon_count for sm in submeshes], dtype=np.int64)
+    # Clamped to the buffer the same way slicing it would be
+    counts = np.clip(np.minimum(counts, len(faces) - starts), 0, None)
+    ends = np.cumsum(counts)
+    owner = np.repeat(np.arange(len(submeshes), dtype=np.int32), counts)
+    if len(submeshes) and np.array_equal(starts[1:], starts[0] + ends[:-1]):
+        # Submeshes usually follow each other in the buffer, then it's one slice
+        tris = faces[starts[0]:starts[0] + ends[-1]].astype(np.int32)
+    else:
+        tris = faces[np.arange(ends[-1] if len(ends) else 0, dtype=np.int64) + np.repeat(starts - (ends - counts), counts)].astype(np.int32)
+    vertex_starts = np.array([sm.vertex_start for sm in submeshes], dtype=np.int32)
+    if vertex_starts.any():
+        tris += np.repeat(vertex_starts, counts)[:, None]
+    return tris, owner
+
+def compact_vertices(faces):
+    """
+    Find the vertices referenced by `faces` and renumber the faces to match
+
+    Returns (used, local_faces): indices into the shared vertex pool in
+    ascending order, and the faces remapped to index into `used`.
+    Cost scales with the submesh, not the whole pool
+    """
+    if faces.size == 0:
+        return np.zeros(0, dtype=np.int32), np.zeros((0, 3), dtype=np.int32)
+    lo = int(faces.min())
+    referenced = np.zeros(int(faces.max()) - lo + 1, dtype=bool)
+    referenced[faces - lo] = True
+    used = np.flatnonzero(referenced).astype(np.int32) + lo
+    remap = np.cumsum(referenced, dtype=np.int32) - 1
+    return used, remap[faces - lo]
+
+def compact_groups(faces, owner, group_count : int) -> list[tuple]:
+    """
+    compact_vertices for every group of faces at once
+
+    `owner` (ascending) gives the group of every face. Every group gets its
+    own stretch of one shared "referenced" mask, so a single cumsum renumbers
+    all of them. When the groups' vertex ranges overlap so much that the mask
+    would dwarf the faces, one sort of (group, vertex) pairs is used instead.
+    Returns a (used, local_faces) pair per group
+    """
+    face_bounds = np.searchsorted(owner, np.arange(group_count + 1))
+    starts = face_bounds[:-1][np.diff(face_bounds) > 0]
+    lo = np.zeros(group_count, dtype=np.int64)
+    span = np.zeros(group_count, dtype=np.int64)
+    if len(starts):
+        groups = owner[starts]
+        lo[groups] = np.minimum.reduceat(faces.reshape(-1), starts * 3)
+        span[groups] = np.maximum.reduceat(faces.reshape(-1), starts * 3) - lo[groups] + 1
+    if span.sum() <= 8 * faces.size:
+        base = np.cumsum(span) - span
+        slots = faces + (base - lo)[owner][:, None]
+        referenced = np.zeros(int(span.sum()), dtype=bool)
+        referenced[slots] = True
+        used = np.flatnonzero(referenced)
+        local = (np.cumsum(referenced, dtype=np.int32) - 1)[slots]
+        used_bounds = np.searchsorted(used, np.append(base, len(referenced))).astype(np.int32)
+        used = (used - np.repeat(base - lo, np.diff(used_bounds))).astype(np.int32)
+    else:
+        pairs, inverse = np.unique((owner.astype(np.int64)[:, None] << 32) | faces, return_inverse=True)
+        local = inverse.reshape(-1, 3).astype(np.int32)
+        used_bounds = np.searchsorted(pairs >> 32, np.arange(group_count + 1)).astype(np.int32)
+        used = (pairs & 0xFFFFFFFF).astype(np.int32)
+    return [(used[used_bounds[g]:used_bounds[g + 1]], local[face_bounds[g]:face_bounds[g + 1]] - used_bounds[g])
+            for g in range(group_count)]
+
+def parse_d3dmesh(filepath,
+                  verbose=False,
+                  tex_names : NameResolver = None,
+                  bone_names : NameResolver = None,
+                  header_only = False,
+                  trace_path : str = None,
+                  profile = None,
+                  ) -> D3DMesh:
+    """
+    Parse a whole .d3dmesh (every LOD), None if it isn't a supported mesh
+
+    Texture and bone hashes are collected in tex_names/bone_names while
+    parsing and only looked up once the whole file has been read.
+    header_only stops after Section 12 and returns a D3DMeshInfo (see probe)
+
+    verbose logs everything the parser reads to the console (None leaves
+    the logging setup alone, see trace.py), trace_path appends a JSON line
+    per section (offset, length, time) and one with the outcome to that file,
+    profile (a profiling.ImportProfile) gets every section timed into it
+    """
+    console_logging(log, verbose)
+    f = WBR(open(filepath, 'rb'))
+    tr = Tracer(log, filepath, trace_path, profile)
+    try:
+        result = _parse_d3dmesh(f, tr, filepath, tex_names, bone_names, header_only)
+    except Exception as e:
+        tr.finish(f.tell(), f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        f.close()
+    tr.finish(f.tell(), "ok" if result is not None else "unsupported")
+    return result
+
+def _checked_count(f : WBR, count : int, item_size : int, what : str) -> int:
+    """count, if count items of at least item_size bytes fit in the rest of the file (garbage counts would run for ages)"""
+    left = f.size - f.tell()
+    if count * item_size > left:
+        raise ValueError(f"{what} = {count} @{f.tell()} doesn't fit in the {left} bytes left of the file")
+    return count
+
+def _parse_d3dmesh(f : WBR, tr : Tracer, filepath, tex_names : NameResolver, bone_names : NameResolver, header_only : bool):
+    tex_names = tex_names or NameResolver()
+    bone_names = bone_names or NameResolver()
+
+    AllFace_array = np.zeros((0, 3), dtype=np.uint16)
+    FaceB_array = np.zeros((0, 3), dtype=np.uint16)
+    AllVert_array = np.zeros((0, 3), dtype=np.float32)
+    B1_array = None
+    W1_array = None
+    BoneIDOffset_array = []
+    BoneIDHash_array = []
+    Lod_array = []
+    MatHash_array = []
+    MatGroup_array = []
+    TexName_array = []
+    FacePointCount = 0
+    FacePointCountB = 0
+    FaceLength = 2
+    FaceLengthB = 2
+
+
+    tr.section("Header start @%d", f.tell(), name="Header", offset=f.tell())
+    header = f.readLong()
+    HeaderMagic = header.to_bytes(4).decode('ascii', errors='replace')
+    tr.record("HeaderMagic = %s", HeaderMagic)
+    if HeaderMagic not in ("MSV5", "MSV6"):
+        raise ValueError(f"header {HeaderMagic!r} not supported (only MSV5/MSV6 are), not a version 55 .d3dmesh")
+    FileSize = f.readLong()
+    tr.record("FileSize = %d", FileSize)
+    f.seek_rel(0x08)
+    ParamCount = _checked_count(f, f.readLong(), 0x0C, "ParamCount")
+    tr.record("ParamCount = %d", ParamCount)
+    f.seek_rel(0x0C * ParamCount)
+    D3DNameHeaderLength = f.readLong()
+    D3DNameLength = f.readLong()
+    if D3DNameLength > D3DNameHeaderLength:
+        f.seek_rel(-0x04)
+        D3DNameLength = D3DNameHeaderLength
+
+    tr.record("D3DNameHeaderLength %d, D3DNameLength %d", D3DNameHeaderLength, D3DNameLength)
+    D3DName = f.readString(D3DNameLength)
+    VerNum = f.readByte()
+    tr.section("Importing %s Version %d...", D3DName, VerNum)
+    if VerNum != 55:
+        tr.warning("%s: model format version %d not supported (only 55 is)", D3DName, VerNum)
+        return
+
+    #Skipping Section 1 (Model Info) skipping
+    tr.section("Section 1 (Model Info) start @%d", f.tell()-1, name="Section 1", offset=f.tell()-1)
+    f.seek_rel(0x14)
+
+    # Section 2 (Material Info)
+    tr.section("Section 2 (Material Info) start @%d", f.tell(), name="Section 2", offset=f.tell())
+    
+    MatCount = _checked_count(f, f.readLong(), 40, "Material Count")
+    tr.record("Material Count = %d", MatCount)
+
+    MatHash_array = []
+    #Parsing Material Info
+    for m in range(MatCount):
+        MatStart = f.tell()
+        MatHash2 = f.readLong()
+        MatHash1 = f.readLong()
+        UnkHash2 = f.readLong()
+        UnkHash1 = f.readLong()
+        MatHeaderSize = f.tell() + f.readLong()
+
+        MatUnk1 = f.readLong()
+        MatUnk2 = f.readLong()
+        MatHeaderSizeB = f.readLong()
+
+        MatUnk3Count = _checked_count(f, f.readLong(), 8, "MatUnk3Count")
+        for x in range(MatUnk3Count):
+            MatUnk3Hash2 = f.readLong()
+            MatUnk3Hash1 = f.readLong()
+
+        MatParamCount = _checked_count(f, f.readLong(), 12, "Material Parameter Count")
+        tr.record("Material #%d start @%d, MatHeaderSize = %d, MatHeaderSizeB = %d", m+1, MatStart, MatHeaderSize, MatHeaderSizeB)
+        TexKeys = []
+        tr.record("Material Parameter Count = %d", MatParamCount)
+        for mp in range(MatParamCount):
+            MatSectHash2, MatSectHash1, MatSectCount = f.readLongs(3)
+            tr.element("Material Param #%d Hash: %8x %8x, Count = %12d, \t@%d", mp+1, MatSectHash1, MatSectHash2, MatSectCount, f.tell())
+            layout = mat_param_layouts.get((MatSectHash1 << 32) | MatSectHash2)
+            if layout is None:
+                # Element size unknown, anything read after this would be garbage
+                tr.warning("Unknown material parameter %x %x in material #%d @%d, skipping the rest of it", MatSectHash1, MatSectHash2, m+1, f.tell())
+                break
+            if layout.dtype is None:
+                f.seek_rel(layout.seek)
+                continue
+            records = f.readArray(layout.dtype, MatSectCount)
+            if layout.name == "Textures":
+                for TypeHash2, TypeHash1, TexHash2, TexHash1 in records.tolist():
+                    tex_type, tex_subtype = mat_type_lookup.get((f"{TypeHash1:x}", f"{TypeHash2:x}"), ("Unknown", f"{TypeHash1:x}{TypeHash2:x}"))
+                    TexKeys.append((tex_type, tex_subtype, tex_names.request(TexHash1, TexHash2)))
+        
+        MatHash_array.append(D3DMaterial(MatHash1, MatHash2, TexKeys))
+        f.seek_abs(MatHeaderSize)
+    
+    tr.record("Section 2 (Material Info) end @%d", f.tell())
+    unk = f.readLong()
+    pad = f.readByte()
+    FaceDataStart = f.tell() + f.readLong() #WOAS: I'd just like to point out how random it is for this pointer to be here of all places, can't imagine how RTB figured this out
+    tr.record("FaceDataStart @%d", FaceDataStart)
+
+    tr.section("Section 3 (LOD info) start @%d", f.tell(), name="Section 3", offset=f.tell())
+    Sect3End = f.tell() + f.readLong()
+    Sect3Count = _checked_count(f, f.readLong(), 116, "LOD Count")
+    tr.record("LOD Count = %d", Sect3Count)
+
+    for lodc in range(Sect3Count):
+        Submesh_array = []
+        Sect3AEnd = f.tell() + f.readLong()
+        PolyTotal = _checked_count(f, f.readLong(), 88, "Submesh Count")
+        tr.record("LOD #%d start @%d, Count = %d", lodc+1, f.tell()-0x4*2, PolyTotal)
+        for polt in range(PolyTotal):
+            BoundingMinX = f.readFloat(); BoundingMinY = f.readFloat(); BoundingMinZ = f.readFloat()
+            BoundingMaxX = f.readFloat(); BoundingMaxY = f.readFloat(); BoundingMaxZ = f.readFloat()
+            HeaderLength = f.readLong()
+            unknown1 = f.readLong()
+            UnkFloat2 = f.readFloat()
+            UnkFloat3 = f.readFloat()
+            UnkFloat4 = f.readFloat()
+            unknown2 = f.readLong()
+            VertexMin = f.readLong() + 1
+            VertexMax = f.readLong() + 1
+            VertexStart = f.readLong()
+            FacePointStart = f.readLong()
+            PolygonStart = int(FacePointStart / 3) + 1
+            PolygonCount = f.readLong()
+            FacePointCount = f.readLong()
+            HeaderLength2 = f.readLong()
+            if HeaderLength2 == 0x10:
+                unknown2A = f.readLong()
+                unknown2B = f.readLong()
+            unknown3 = f.readLong()
+            MatNum = f.readLong() + 1
+            unknown4 = f.readLong() + 1
+            Submesh_array.append(D3DSubmesh(
+                lod = lodc,
+                vertex_start = VertexStart,
+                vertex_min = VertexMin - 1,
+                vertex_max = VertexMax - 1,
+                polygon_start = PolygonStart - 1,
+                polygon_count = PolygonCount,
+                face_point_count = FacePointCount,
+                mat_num = MatNum - 1,
+                bbox_min = (BoundingMinX, BoundingMinY, BoundingMinZ),
+                bbox_max = (BoundingMaxX, BoundingMaxY, BoundingMaxZ),
+            ))
+            tr.element("Bounding Box = (%s, %s, %s)|(%s, %s, %s)", BoundingMinX, BoundingMinY, BoundingMinZ, BoundingMaxX, BoundingMaxY, BoundingMaxZ)
+            tr.element("VertStart @ %d, Vertminmax = (%d, %d), Polystart @%d, PolyCount = %d, FacePointCount = %d, Matnum %d, Unknowns = (%d, %d, %d, %d)",
+                       VertexStart, VertexMin, VertexMax, PolygonStart, PolygonCount, FacePointCount, MatNum, unknown1, unknown2, unknown3, unknown4)
+        f.seek_abs(Sect3AEnd)
+
+        tr.record("Section 3B start @%d", f.tell())
+        Sect3BEnd = f.tell() + f.readLong()
+        Poly2Total = _checked_count(f, f.readLong(), 88, "Section 3B Count")
+        for polt2 in range(Poly2Total):
+            BoundingMinX = f.readFloat(); BoundingMinY = f.readFloat(); BoundingMinZ = f.readFloat()
+            BoundingMaxX = f.readFloat(); BoundingMaxY = f.readFloat(); BoundingMaxZ = f.readFloat()
+            HeaderLength = f.readLong()
+            unknown1 = f.readLong()
+            UnkFloat2 = f.readFloat()
+            UnkFloat3 = f.readFloat()
+            UnkFloat4 = f.readFloat()
+            unknown2 = f.readLong()
+            VertexMin = f.readLong() + 1
+            VertexMax = f.readLong() + 1
+            VertexStart = f.readLong()
+            FacePointStart = f.readLong()
+            PolygonStart = int(FacePointStart / 3) + 1
+            PolygonCount = f.readLong()
+            FacePointCount = f.readLong()
+            HeaderLength2 = f.readLong()
+            if HeaderLength2 == 0x10:
+                unknown2A = f.readLong()
+                unknown2B = f.readLong()
+            unknown3 = f.readLong()
+            MatNum = f.readLong() + 1
+            unknown4 = f.readLong() + 1
+            
+            tr.element("Bounding Box = (%s, %s, %s)|(%s, %s, %s)", BoundingMinX, BoundingMinY, BoundingMinZ, BoundingMaxX, BoundingMaxY, BoundingMaxZ)
+            tr.element("VertStart @ %d, Vertminmax = (%d, %d), Polystart @%d, PolyCount = %d, FacePointCount = %d, Matnum %d, Unknowns = (%d, %d, %d, %d)",
+                       VertexStart, VertexMin, VertexMax, PolygonStart, PolygonCount, FacePointCount, MatNum, unknown1, unknown2, unknown3, unknown4)
+
+        f.seek_abs(Sect3BEnd)
+
+        tr.record("Section 3C start @%d", f.tell())
+        unknown1 = f.readLong()
+        unknown2 = f.readLong()
+        BoundingMinX = f.readFloat(); BoundingMinY = f.readFloat(); BoundingMinZ = f.readFloat()
+        BoundingMaxX = f.readFloat(); BoundingMaxY = f.readFloat(); BoundingMaxZ = f.readFloat()
+        unknown3 = (f.readLong()) - 4
+        UnkFloat1 = f.readFloat()
+        UnkFloat2 = f.readFloat()
+        UnkFloat3 = f.readFloat()
+        UnkFloat4 = f.readFloat()
+        blank1 = f.readLong()
+        blank2 = f.readLong()
+        unknown4 = f.readLong()
+        unknown5 = f.readLong()
+        blank3 = f.readLong()
+        unknown6 = f.readLong()
+        unknown7 = f.readLong()
+        unknown8 = f.readLong()
+        unknown9 = f.readLong()
+        unknown10 = f.readLong()
+
+        tr.record("Bounding Box = (%s, %s, %s)|(%s, %s, %s)", BoundingMinX, BoundingMinY, BoundingMinZ, BoundingMaxX, BoundingMaxY, BoundingMaxZ)
+        LodBBox = ((BoundingMinX, BoundingMinY, BoundingMinZ), (BoundingMaxX, BoundingMaxY, BoundingMaxZ))
+        #mostly unknowns here, skipping
+
+        IDHeaderLen = f.readLong() - 4
+        BoneIDOffset_array.append(f.tell())
+        BoneIDCount = _checked_count(f, f.readLong(), 8, "Bone ID Count")
+        tr.record("Section 3D (Bone IDs) start @%d, Count = %d", f.tell(), BoneIDCount)
+        BoneIDHashes = []
+        for bid in range(BoneIDCount):
+            BoneHash2, BoneHash1 = f.readLongs(2)
+            BoneIDHashes.append(bone_names.request(BoneHash1, BoneHash2))
+        BoneIDHash_array.append(BoneIDHashes)
+        Lod_array.append(D3DLod(Submesh_array, BoneIDHashes, BoneIDOffset_array[-1], *LodBBox))
+
+
+    f.seek_abs(Sect3End)
+    tr.section("Section 4 (Empty?) start @%d", f.tell(), name="Section 4", offset=f.tell())
+    Sect4End = f.tell() + f.readLong()
+    Sect4Count = f.readLong()
+    tr.record("Count = %d", Sect4Count)
+    f.seek_abs(Sect4End)
+
+    tr.section("Section 5 (Material Groups) start @%d", f.tell(), name="Section 5", offset=f.tell())
+    Sect5End = f.tell() + f.readLong()
+    MatGroupCount = _checked_count(f, f.readLong(), 76, "Material Group Count")
+    for mg in range(MatGroupCount):
+        MatSectLength = f.readLong()
+        MatHash2 = f.readLong()
+        MatHash1 = f.readLong()
+        MatUnkHash2 = f.readLong()
+        MatUnkHash1 = f.readLong()
+        blank1 = f.readFloat()
+        blank2 = f.readFloat()
+        MatFloatA = f.readFloat()
+        MatFloatB = f.readFloat()
+        MatFloatC = f.readFloat()
+        MatFloatD = f.readFloat()
+        MatFloatE = f.readFloat()
+        MatFloatF = f.readFloat()
+        MatFloats = [MatFloatA,MatFloatB,MatFloatC,MatFloatD,MatFloatE,MatFloatF,]
+        MatSubHeaderLen = f.readLong()
+        MatSubFloatA = f.readFloat()
+        MatSubFloatB = f.readFloat()
+        MatSubFloatC = f.readFloat()
+        MatSubFloatD = f.readFloat()
+        MatSubFloats = [MatSubFloatA,MatSubFloatB,MatSubFloatC,MatSubFloatD,]
+        MatUnk = f.readLong()
+        tr.element("Floats = %s, %s", MatFloats, MatSubFloats)
+        MatGroup = -1
+        for y in range(len(MatHash_array)):
+            if MatHash_array[y].hash1 == MatHash1 and MatHash_array[y].hash2 == MatHash2:
+                MatGroup = y
+                break
+        MatGroup_array.append(MatGroup)
+    f.seek_abs(Sect5End)
+
+    tr.section("Section 6 start @%d", f.tell(), name="Section 6", offset=f.tell())
+    Sect6End = f.tell() + f.readLong()
+    Sect6Count = _checked_count(f, f.readLong(), 16, "Section 6 Count")
+    tr.record("Count = %d", Sect6Count)
+    for sx in range(Sect6Count):
+        Sect6HeaderLen, Sect6Hash2, Sect6Hash1, Sect6Unk = f.readLongs(4)
+    
+    f.seek_abs(Sect6End)
+
+    tr.section("Section 7 (Bone IDs) start @%d", f.tell(), name="Section 7", offset=f.tell())
+    Sect7End = f.tell() + f.readLong()
+    BoneIDCount = f.readLong()
+    if BoneIDCount > 0: BoneIDSets = 1
+    tr.record("Count = %d", BoneIDCount)
+    
+    f.seek_abs(Sect7End)
+    tr.section("Section 8 (Empty?) start @%d", f.tell(), name="Section 8", offset=f.tell())
+    Sect8End = f.tell() + f.readLong()
+    Sect8Count = f.readLong()
+    tr.record("Count = %d", Sect8Count)
+
+    f.seek_abs(Sect8End)
+    tr.section("Section 9 (Empty?) start @%d", f.tell(), name="Section 9", offset=f.tell())
+    Sect9End = f.tell() + f.readLong()
+    Sect9Count = f.readLong()
+    tr.record("Count = %d", Sect9Count)
+
+    f.seek_abs(Sect9End)
+    tr.section("Section 10 (Model Clamps) start @%d", f.tell(), name="Section 10", offset=f.tell())
+    if (True): # just for folding
+        MeshUnk1 = f.readLong()
+        MeshFlag1 = f.readByte()
+        MeshFlag2 = f.readByte()
+        MeshFlag3 = f.readByte()
+        MeshFlag4 = f.readByte()
+        MeshXMin = f.readFloat(); MeshYMin = f.readFloat(); MeshZMin = f.readFloat()
+        MeshXMax = f.readFloat(); MeshYMax = f.readFloat(); MeshZMax = f.readFloat()
+        MeshXMult = MeshXMax - MeshXMin; 
+        MeshYMult = MeshYMax - MeshYMin; 
+        MeshZMult = MeshZMax - MeshZMin
+
+        MeshSubSectLength = f.readLong()
+        MeshFloatA = f.readFloat()
+        MeshFloatB = f.readFloat()
+        MeshFloatC = f.readFloat()
+        MeshFloatD = f.readFloat()
+        MeshUnk3 = f.readLong()
+        MeshFloat1 = f.readFloat()
+        MeshFloat2 = f.readFloat()
+        MeshFloat3 = f.readFloat()
+        MeshFloatX = f.readFloat()
+        MeshFloatY = f.readFloat()
+        MeshFloatZ = f.readFloat()
+        MeshFloat4 = f.readFloat()
+        MeshFloat5 = f.readFloat()
+        MeshFloat6 = f.readFloat()
+        MeshUnk4 = f.readLong()
+        MeshHash2 = f.readLong()
+        MeshHash1 = f.readLong()
+        MeshOrient = "Q"
+        if (MeshFloatX != 0x00) : MeshOrient = "X"
+        if (MeshFloatY != 0x00) : MeshOrient = "Y"
+        if (MeshFloatZ != 0x00) : MeshOrient = "Z"
+        tr.record("Flags = 0x%x, 0x%x, 0x%x, 0x%x, Orientation = %s", MeshFlag1, MeshFlag2, MeshFlag3, MeshFlag4, MeshOrient)
+    
+    tr.section("Section 11 start @%d", f.tell(), name="Section 11", offset=f.tell())
+
+    VertCount = f.readLong()
+    VertFlags = f.readLong()
+    Sect11AEnd = f.tell() + f.readLong()
+    Sect11ACount = f.readLong()
+    tr.record("Flags: 0x%x, Count = %d", VertFlags, Sect11ACount)
+
+    f.seek_abs(Sect11AEnd)
+    tr.record("Section 11B (UV Clamps) start @%d", f.tell())
+    UVLayerCount = _checked_count(f, f.readLong(), 20, "UV Clamp Count")
+    tr.record("UV Clamp Count = %d", UVLayerCount)
+    
+    UVMults = [[1,1]]*6
+    UVStarts = [[0,0]]*6
+
+    for uvl in range(UVLayerCount):
+        UVLayer = f.readLong()
+        UVXMult = f.readFloat(); UVYMult = f.readFloat()
+        UVXStart = f.readFloat(); UVYStart = f.readFloat()
+        if UVLayer not in [0,1,2,3,4,5]:
+            tr.warning("Unknown UV layer %d in the UV clamps", UVLayer)
+            continue
+        UVMults[UVLayer] = [UVXMult, UVYMult]
+        UVStarts[UVLayer] = [UVXStart, UVYStart]
+        tr.element("UV Layer #%d UV Mul = %s, UV Start = %s", UVLayer+1, UVMults[UVLayer], UVStarts[UVLayer])
+
+    if (VertCount == 0):
+        return
+
+    tr.record("Section 11C start @%d", f.tell())
+    Formats = {}
+
+    match VertFlags:
+        case 0x00 | 0x01 | 0x03 | 0x05 | 0x09 | 0x21: tr.record("Unimportant VertexFlags")
+        case 0x31:
+            VertBuffUnk1 = f.readLong()
+            VertBuffUnk2 = f.readLong()
+            VertBuffUnk3 = f.readLong()
+            VertBuffUnk4 = f.readLong()
+            VertBuffUnk5 = f.readLong()
+            VertBuffUnk6 = f.readLong()
+            VertBuffUnk7 = f.readLong()
+            VertBuffUnk8 = f.readLong()
+            VertBuffUnk9 = f.readLong()
+            VertParamStart = f.tell() + f.readLong()
+            VertBuffSize = f.readLong()
+            VertStart = f.tell()
+            f.seek_abs(VertParamStart)
+        case _: tr.warning("Unknown vertex flags 0x%x", VertFlags)
+    
+    tr.section("Section 12 (Vertex/Face Buffer Info) start @%d", f.tell(), name="Section 12", offset=f.tell())
+
+
+    BuffUnk1 = f.readLong()
+    BuffUnk2 = f.readLong()
+    FaceBufferCount = f.readLong()
+    BufferCount1 = f.readLong()
+    BufferCount2 = f.readLong()
+    # Stream, index buffer and Buffer2 entries, 20 bytes each
+    _checked_count(f, BufferCount1 + FaceBufferCount + BufferCount2 + 1, 20, "Section 12 entry count")
+
+    for buf in range(BufferCount1):
+        VertType = f.readLong() + 1
+        VertFormat = f.readLong() + 1
+        VertLayer = f.readLong() + 1
+        VertBuffNum = f.readLong() + 1
+        VertOffset = f.readLong() + 1
+        name = stream_names.get((VertType, VertLayer))
+        if name is None:
+            tr.warning("Unknown vertex buffer combo: Type = %d, Format = %d, Layer = %d", VertType, VertFormat, VertLayer)
+            continue
+        Formats[name] = VertFormat
+        tr.element("Vertex Type = %d, Format = %d,  Layer = %d, Buffer Number = %d, Offset = %d (%s Format)",
+                   VertType, VertFormat, VertLayer, VertBuffNum, VertOffset, name)
+    
+    tr.record("Writing down FacePointCounts... FaceBufferCount = %d", FaceBufferCount)
+    for fb in range(FaceBufferCount):
+        FaceBuffUnk1,FaceBuffUnk2,FaceBuffUnk3,FaceBuffCount,FaceBuffLength = f.readLongs(5)
+        match fb:
+            case 0: FacePointCount = FaceBuffCount; FaceLength = FaceBuffLength
+            case 1: FacePointCountB = FaceBuffCount; FaceLengthB = FaceBuffLength
+
+    for buff in range(BufferCount2+1):
+        Buff2Unk1,Buff2Format,Buff2Unk2,Buff2Count,Buff2Length = f.readLongs(5)
+
+    if header_only:
+        f.close()
+        return D3DMeshInfo(
+            path = filepath,
+            name = D3DName,
+            version = VerNum,
+            file_size = FileSize,
+            vert_count = VertCount,
+            tri_count = FacePointCount // 3,
+            lod_count = len(Lod_array),
+            submesh_count = sum(len(lod.submeshes) for lod in Lod_array),
+            lod_tri_counts = [sum(sm.polygon_count for sm in lod.submeshes) for lod in Lod_array],
+            materials = [f"{mat.hash1:08x}{mat.hash2:08x}" for mat in MatHash_array],
+            bbox_min = (MeshXMin, MeshYMin, MeshZMin),
+            bbox_max = (MeshXMax, MeshYMax, MeshZMax),
+            formats = Formats,
+            skinned = "Weights" in Formats or "Bones" in Formats or VertFlags == 0x31,
+        )
+
+    f.seek_abs(FaceDataStart)
+    tr.section("Facepoint buffer A start @%d, Count = %d (%d)", f.tell(), FacePointCount, FacePointCount // 3, name="Index buffer A", offset=f.tell())
+
+    StreamOffsets = {}
+    IndexOffset = f.tell()
+    AllFace_array = read_index_buffer(f, FacePointCount, FaceLength)
+    
+    if (FaceBufferCount == 2):
+        tr.section("Facepoint buffer B start @%d, Count = %d", f.tell(), FacePointCountB, name="Index buffer B", offset=f.tell())
+        
+        FaceB_array = read_index_buffer(f, FacePointCountB, FaceLengthB)
+        
+        tr.record("Facepoint buffer B end @%d", f.tell())
+    
+    match VertFlags:
+        case 0x00|0x01|0x03|0x05|0x09|0x21:
+            tr.record("Skipping useless VertFlags %x", VertFlags)
+        case 0x31:
+            VertStartB = f.tell()
+            f.seek_abs(VertStart)
+            StreamOffsets["Interleaved"] = VertStart
+
+            InterleavedVerts = f.readArray(_INTERLEAVED_DTYPE, VertCount)
+            B1_array = np.array(InterleavedVerts['bones'])
+            
+            f.seek_abs(VertStartB)
+    
+    if "Vertex" not in Formats:
+        return
+    
+    tr.section("Positions start @ %d", f.tell(), name="Vertex", offset=f.tell())
+    StreamOffsets["Vertex"] = f.tell()
+    if Formats["Vertex"] in position_strides:
+        AllVert_array = decode_positions(
+            f,
+            Formats["Vertex"],
+            VertCount,
+            (MeshXMin, MeshYMin, MeshZMin),
+            (MeshXMult, MeshYMult, MeshZMult),
+            MeshOrient,
+        )
+    else:
+        tr.warning("Unknown position format %d", Formats['Vertex'])
+
+    UV_arrays = {}
+    Vec_arrays = {}
+    Color_arrays = {}
+    for stream in stream_order:
+        if stream not in Formats:
+            continue
+        fmt = Formats[stream]
+        if fmt not in format_strides:
+            tr.warning("Unknown %s format %d, skipping the remaining vertex streams", stream, fmt)
+            break
+        tr.section("%s start @ %d", stream, f.tell(), name=stream, offset=f.tell())
+        StreamOffsets[stream] = f.tell()
+        decoded = decode_stream(f, stream, fmt, VertCount, UVMults, UVStarts)
+        if decoded is None:
+            tr.record("Skipping %s format %d", stream, fmt)
+            f.seek_rel(format_strides[fmt] * VertCount)
+        elif stream == "Weights":
+            W1_array = decoded
+        elif stream == "Bones":
+            B1_array = decoded
+        elif stream in ("Normals", "Tangents", "Binormals"):
+            Vec_arrays[stream] = decoded
+        elif stream in ("Colors", "Colors2"):
+            Color_arrays[stream] = decoded
+        else:
+            UV_arrays[stream] = decoded
+
+    f.close()
+
+    mesh = D3DMesh(
+        name = D3DName,
+        version = VerNum,
+        file_size = FileSize,
+        materials = MatHash_array,
+        lods = Lod_array,
+        bbox_min = (MeshXMin, MeshYMin, MeshZMin),
+        bbox_max = (MeshXMax, MeshYMax, MeshZMax),
+        orient = MeshOrient,
+        vert_count = VertCount,
+        vert_flags = VertFlags,
+        uv_mults = UVMults,
+        uv_starts = UVStarts,
+        formats = Formats,
+        positions = AllVert_array,
+        faces = AllFace_array,
+        faces_b = FaceB_array,
+        uvs = {name: UV_arrays[name] for name in uv_layer_names if name in UV_arrays},
+        weights = W1_array,
+        bones = B1_array,
+        normals = Vec_arrays["Normals"][:, :3].copy() if "Normals" in Vec_arrays else None,
+        tangents = Vec_arrays.get("Tangents"),
+        binormals = Vec_arrays.get("Binormals"),
+        colors = Color_arrays,
+        material_groups = MatGroup_array,
+        index_offset = IndexOffset,
+        index_size = FaceLength,
+        stream_offsets = StreamOffsets,
+    )
+    # Every hash this file needs is known now, look them all up at once
+    resolve_names(mesh, tex_names, bone_names, None)
+    return mesh
+
+def probe(filepath) -> D3DMeshInfo:
+    """
+    Header info of a .d3dmesh without reading its vertex or index buffers
+
+    None if it isn't a supported mesh (or has no vertices)
+    """
+    return parse_d3dmesh(filepath, header_only=True)
+
+def resolve_names(mesh : D3DMesh, tex_names : NameResolver = None, bone_names : NameResolver = None, verbose = None):
+    """Look up the texture and bone names a parsed (or cached) mesh refers to"""
+    console_logging(log, verbose)
+    tex_names = tex_names or NameResolver()
+    bone_names = bone_names or NameResolver()
+    for mat in mesh.materials:
+        for tex_type, tex_subtype, tex_key in mat.textures:
+            tex_names.request(*tex_key)
+    for lod in mesh.lods:
+        for key in lod.bone_hashes:
+            bone_names.request(*key)
+    tex_names.resolve()
+    bone_names.resolve()
+    for lod in mesh.lods:
+        lod.bone_names = [bone_names.name(key) for key in lod.bone_hashes]
+    for m, mat in enumerate(mesh.materials):
+        mat.texture_names = [tex_names.name(tex_key) for tex_type, tex_subtype, tex_key in mat.textures]
+        if log.isEnabledFor(RECORD):
+            log.log(RECORD, "-----------")
+            log.log(RECORD, "Material #%d uses following textures:", m+1)
+            for (tex_type, tex_subtype, tex_key), tex_name in zip(mat.textures, mat.texture_names):
+                log.log(RECORD, "%s|%s - %s", tex_type, tex_subtype, tex_name)
+        if mat.textures:
+            mat.diffuse_name = mat.texture_names[-1]
+
+def mesh_tables(mesh : D3DMesh) -> tuple[dict, dict]:
+    """
+    Split a D3DMesh into (tables, arrays)
+
+    tables holds everything but the vertex/index data as plain JSON-able
+    values, dicts of per-layer arrays are listed as {"__arrays__": [layers]}
+    and stored in arrays as "<field>/<layer>"
+    """
+    tables = {}
+    arrays = {}
+    for fld in dataclasses.fields(mesh):
+        value = getattr(mesh, fld.name)
+        if isinstance(value, np.ndarray):
+            arrays[fld.name] = value
+        elif isinstance(value, dict) and value and all(isinstance(v, np.ndarray) for v in value.values()):
+            for key, arr in value.items():
+                arrays[f"{fld.name}/{key}"] = arr
+            tables[fld.name] = {"__arrays__": list(value)}
+        elif isinstance(value, list) and value and dataclasses.is_dataclass(value[0]):
+            tables[fld.name] = [dataclasses.asdict(item) for item in value]
+        else:
+            tables[fld.name] = value
+    return tables, arrays
+
+def _tuples(items) -> list:
+    return [tuple(item) if isinstance(item, list) else item for item in items]
+
+def mesh_from_tables(tables : dict, arrays) -> D3DMesh:
+    """Inverse of mesh_tables, tables may have been through JSON"""
+    kwargs = {}
+    for fld in dataclasses.fields(D3DMesh):
+        if fld.name in tables:
+            value = tables[fld.name]
+            if isinstance(value, dict) and "__arrays__" in value:
+                value = {key: arrays[f"{fld.name}/{key}"] for key in value["__arrays__"]}
+            kwargs[fld.name] = value
+        elif fld.name in arrays:
+            kwargs[fld.name] = arrays[fld.name]
+    # JSON turns every tuple into a list, hash keys need to be tuples again
+    kwargs["materials"] = [D3DMaterial(**dict(mat, textures=[(t, st, tuple(key)) for t, st, key in mat["textures"]]))
+                           for mat in kwargs["materials"]]
+    kwargs["lods"] = [D3DLod(**dict(lod,
+                                    submeshes=[D3DSubmesh(**dict(sm, bbox_min=tuple(sm["bbox_min"]), bbox_max=tuple(sm["bbox_max"])))
+                                               for sm in lod["submeshes"]],
+                                    bone_hashes=_tuples(lod["bone_hashes"]),
+                                    bbox_min=tuple(lod["bbox_min"]),
+                                    bbox_max=tuple(lod["bbox_max"])))
+                      for lod in kwargs["lods"]]
+    kwargs["bbox_min"] = tuple(kwargs["bbox_min"])
+    kwargs["bbox_max"] = tuple(kwargs["bbox_max"])
+    return D3DMesh(**kwargs)
+
+def load_lod(filepath, tables : dict, lodnum : int) -> D3DMesh:
+    """
+    Read one LOD of a file straight from its buffers, no full parse
+
+    tables are the mesh_tables of an earlier parse of the same file. Only
+    the LOD's slice of the index buffer and the vertex range its triangles
+    reference are read. Returns a D3DMesh with only this LOD's geometry,
+    its submeshes rebased onto the slices (build it with
+    mesh_parts(..., lods=[lodnum]))
+    """
+    lod = tables["lods"][lodnum]
+    submeshes = [D3DSubmesh(**sm) for sm in lod["submeshes"]]
+    index_size = tables["index_size"]
+    poly_start = min((sm.polygon_start for sm in submeshes), default=0)
+    poly_end = max((sm.polygon_start + sm.polygon_count for sm in submeshes), default=0)
+    with WBR(open(filepath, 'rb')) as f:
+        f.seek_abs(tables["index_offset"] + poly_start * 3 * index_size)
+        faces = read_index_buffer(f, (poly_end - poly_start) * 3, index_size)
+        for sm in submeshes:
+            sm.polygon_start -= poly_start
+        tris, owner = submesh_faces(faces, submeshes)
+        vert_start = int(tris.min()) if tris.size else 0
+        count = int(tris.max()) - vert_start + 1 if tris.size else 0
+        for sm in submeshes:
+            sm.vertex_start -= vert_start
+
+        formats = tables["formats"]
+        offsets = tables["stream_offsets"]
+        arrays = {"faces": faces, "faces_b": np.zeros((0, 3), dtype=np.uint16)}
+        f.seek_abs(offsets["Vertex"] + vert_start * position_strides[formats["Vertex"]])
+        arrays["positions"] = decode_positions(f, formats["Vertex"], count, tables["bbox_min"],
+                                               np.subtract(tables["bbox_max"], tables["bbox_min"]), tables["orient"])
+        if "Interleaved" in offsets:
+            f.seek_abs(offsets["Interleaved"] + vert_start * _INTERLEAVED_DTYPE.itemsize)
+            arrays["bones"] = np.array(f.readArray(_INTERLEAVED_DTYPE, count)['bones'])
+        for stream in stream_order:
+            if stream not in offsets:
+                continue
+            fmt = formats[stream]
+            f.seek_abs(offsets[stream] + vert_start * format_strides[fmt])
+            decoded = decode_stream(f, stream, fmt, count, tables["uv_mults"], tables["uv_starts"])
+            match stream:
+                case _ if decoded is None: pass
+                case "Weights": arrays["weights"] = decoded
+                case "Bones": arrays["bones"] = decoded
+                case "Normals": arrays["normals"] = decoded[:, :3].copy()
+                case "Tangents": arrays["tangents"] = decoded
+                case "Binormals": arrays["binormals"] = decoded
+                case _:
+                    # Per-layer streams (UVs, colours)
+                    arrays[f"{'uvs' if stream in uv_layer_names else 'colors'}/{stream}"] = decoded
+
+    # The other LODs keep their tables (so submesh numbering stays the same) but have no geometry here
+    lods = list(tables["lods"])
+    lods[lodnum] = dict(lod, submeshes=[dataclasses.asdict(sm) for sm in submeshes])
+    return mesh_from_tables(dict(tables, lods=lods, vert_count=count), arrays)
+
+def uv_sets(mesh : D3DMesh, uv_layers = 'MERGE') -> list[tuple]:
+    """
+    (name suffix, UV layers) of every copy of an object the uv_layers mode asks for
+
+    MERGE puts every layer on one object, SPLIT puts UV1 on it and makes
+    a copy of the object per extra layer, NO imports no UVs at all
+    """
+    main = tuple(name for name in mesh.uvs if name == "UV1")
+    extra = [name for name in mesh.uvs if name != "UV1"]
+    match uv_layers:
+        case 'MERGE': return [("", main + tuple(extra))]
+        case 'SPLIT': return [("", main)] + [(f" (Layer {name[2:]})", (name,)) for name in extra]
+        case _: return [("", ())]
+
+def mesh_parts(mesh : D3DMesh, parse_lods = False, join_submeshes = True, uv_layers = 'MERGE', lods : list = None) -> list[MeshPart]:
+    """
+    Split a parsed mesh into the objects an import creates
+
+    One part per LOD when joining submeshes, otherwise one per submesh
+    (times the UV layer copies SPLIT asks for).
+    Only LOD0 unless parse_lods (or the LOD numbers in lods, named as with
+    parse_lods). Every part gets its own compacted vertex list
+    """
+    parts = []
+    submeshes = mesh.submeshes
+    lod_suffix = (parse_lods or lods is not None) and len(mesh.lods) > 1
+    copies = uv_sets(mesh, uv_layers)
+    if lods is None:
+        lods = range(len(mesh.lods) if parse_lods else min(1, len(mesh.lods)))
+    for lodnum in lods:
+        suffix = f" (LOD #{lodnum})" if lod_suffix else ""
+        ids = [i for i, sm in enumerate(submeshes) if sm.lod == lodnum]
+        tris, owner = submesh_faces(mesh.faces, [submeshes[i] for i in ids])
+        face_groups = np.array([submeshes[i].mat_num for i in ids], dtype=np.int32)[owner]
+        if join_submeshes:
+            used, faces = compact_vertices(tris)
+            groups = [(f"{mesh.name}{suffix}", ids, used, faces, face_groups)]
+        else:
+            face_bounds = np.searchsorted(owner, np.arange(len(ids) + 1))
+            groups = [(f"{mesh.name}_{i:03}{suffix}", [i], used, faces, face_groups[face_bounds[n]:face_bounds[n + 1]])
+                      for n, (i, (used, faces)) in enumerate(zip(ids, compact_groups(tris, owner, len(ids))))]
+        for name, group, used, faces, groups_of_faces in groups:
+            for uv_suffix, uvs in copies:
+                parts.append(MeshPart(name + uv_suffix, lodnum, group, used, faces, uvs, groups_of_faces))
+    return parts
+
+def skin_groups(mesh : D3DMesh, part : MeshPart) -> dict:
+    """
+    Vertex group contents of a part: {bone name: [(weight, vertex ids), ...]}
+
+    Bone indices go through the part's LOD bone palette (out of range ones
+    fall back to its first bone), zero weights are dropped and every
+    influence of the same bone and weight ends up in one list.
+    Vertex ids (plain lists) index into the part's vertices
+    """
+    palette = mesh.lods[part.lod].bone_names
+    if not palette or (mesh.weights is None and mesh.bones is None):
+        return {}
+    count = len(part.vert_ids)
+    # Missing streams default like the reference: every vertex fully on bone 0
+    if mesh.bones is not None:
+        bones = mesh.bones[part.vert_ids].astype(np.int32)
+    else:
+        bones = np.zeros((count, 4), dtype=np.int32)
+    if mesh.weights is not None:
+        weights = mesh.weights[part.vert_ids]
+    else:
+        weights = np.zeros((count, 4), dtype=np.float32)
+        weights[:, 0] = 1
+    bones[bones >= len(palette)] = 0
+
+    verts = np.repeat(np.arange(count, dtype=np.int32), 4)
+    bones = bones.reshape(-1)
+    weights = weights.reshape(-1)
+    keep = weights != 0
+    verts, bones, weights = verts[keep], bones[keep], weights[keep]
+
+    # Sort by (bone, weight bits), only equal pairs need to end up next to each other
+    keys = (bones.astype(np.int64) << 32) | weights.view(np.uint32)
+    order = np.argsort(keys)
+    keys, verts, bones, weights = keys[order], verts[order], bones[order], weights[order]
+    # Start of every run of equal (bone, weight)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(verts)]
+
+    # Plain lists, ready for VertexGroup.add
+    verts = verts.tolist()
+    groups = {}
+    for bone, weight, start, end in zip(bones[starts].tolist(), weights[starts].tolist(), starts.tolist(), ends.tolist()):
+        groups.setdefault(palette[bone], []).append((weight, verts[start:end]))
+    return groups
+
+mat_type_lookup = {
+    ("98369708","82a34f02"):("Anisotropy","Map"),
+    ("714d2344","5936b35d"):("Anisotropy Mask","Map"),
+    ("7501e041","ac72a988"):("Anisotropy Tangent","Map"),
+    ("b8b04ddf","1796f446"):("Bump","Map"),
+    ("72507eea","6ef21aee"):("Color Mask","Map"),
+    ("2b6c4784","5f607734"):("Damage Mask","Map A"),
+    ("ec7d65b8","a55e2c81"):("Damage Mask","Map B"),
+    ("36170f97","445b6e2e"):("Decal Diffuse","Map"),
+    ("a1f1257a","331854c4"):("Decal Mask","Map"),
+    ("9cf676c6","403c9784"):("Decal Normal","Map"),
+    ("4930b970","a7fd511f"):("Detail","Map"),
+    ("df7e4122","56e87e74"):("Detail","Map B"),
+    ("cb433436","edca9efb"):("Detail Gloss","Map"),
+    ("bf468ef4","80aeeb89"):("Detail Mask","Map"),
+    ("63ee638","83014f19"):("Detail Normal","Map"),
+    ("706cf2aa","57a7a206"):("Detail Normal","Map"),
+    ("d49d30f6","4a580c6f"):("Detail Normal","Map A"),
+    ("138c12ca","b06657da"):("Detail Normal","Map B"),
+    ("517cf321","198c6149"):("Detail Normal","Map C"),
+    ("bdcd25f2","f4199e3"):("Packed Detail","Map"),
+    ("8648fa82","d1dbee1a"):("Diffuse","Map"),
+    ("94a590de","74b1f5c1"):("Diffuse","Map B"),
+    ("dc6e83a0","253f163a"):("Diffuse LOD","Map"),
+    ("b3022ea7","fd418b40"):("Emission","Map"),
+    ("bdb4c92a","546fb889"):("Emission","Map B"),
+    ("13eee658","65dfc90f"):("Environment","Map"),
+    ("257c2a45","683f7d2f"):("Environment","Map"),
+    ("8cadb260","98df1108"):("Flow","Map"),
+    ("64fba83e","34dd3959"):("Gloss","Map"),
+    ("2642d6b4","c8eccaa9"):("Gradient","Map"),
+    ("a334f76c","317a0c02"):("Gradient","Map"),
+    ("2aa89260","d8661f89"):("Grime","Map"),
+    ("66cd6e57","fa58a246"):("Height","Map"),
+    ("ff787a61","eac8a5b5"):("Ink","Map"),
+    ("17afd53","2445b8b8"):("Microdetail Diffuse","Map"),
+    ("cb5b9a7f","52168a41"):("Microdetail Normal","Map"),
+    ("1e3f6b9f","2550389d"):("Normal","Map"),
+    ("3f380050","afd9f81f"):("Normal","Map B"),
+    ("436206e6","8a9e7cca"):("Normal","Map B"),
+    ("7498a5f1","b80ad419"):("Normal Alternate","Map"),
+    ("caaae643","2af348c0"):("Occlusion","Map"),
+    ("62c49575","78189f07"):("Occlusion","Map"),
+    ("533f479d","8bf0e5e"):("Rain Fall","Map"),
+    ("2eba1f4b","ba7a1543"):("Rain Wet","Map"),
+    ("4e2ed73c","e95b0e15"):("Reflection","Map"),
+    ("c8c94155","fb7c634b"):("Specular","Map"),
+    ("d5b57775","db361670"):("Specular","Map"),
+    ("120621d5","fad4c090"):("Specular","Map B"),
+    ("37571b60","b1f61180"):("Tangent","Map B"),
+    ("a45200a2","22dc2d80"):("Thickness","Map") ,
+    ("8cf38a52","66aaa7a4"):("Transition Normal","Map"),
+    ("87b579ec","18fbd4d"):("Visibility Mask","Map"),
+    ("d7ea3553","4dbc457d"):("Wrinkle Mask","Map A"),
+    ("10fb176f","b7821ec8"):("Wrinkle Mask","Map B"),
+    ("340c569","ce9e059f"):("Wrinkle Normal","Map"),
+    ("a13d14fb","b436f23b"):("Wrinkle Normal","Map"),
+}
@@ -0,0 +1,273 @@
+import hashlib
+import mmap
+import os
+import struct
+import time
+import numpy as np
+
+# On-disk hash -> name index
+#
+# header  : magic, version, count, blob size,
+#           size, mtime and SHA-1 of the .HashDB it was built from
+# keys    : uint64[count], sorted, (hash1 << 32) | hash2
+# offsets : uint32[count + 1], start of each name in the blob
+# blob    : every name, UTF-8, back to back
+#
+# The file is memory-mapped, so opening it costs the same for any DB size
+# and lookups only touch the pages a binary search lands on.
+# It doubles as the cache of the parsed .HashDB: it is only reused while
+# its recorded source signature still matches the .HashDB on disk
+
+INDEX_MAGIC = b"TTHI"
+INDEX_VERSION = 2
+_header = struct.Struct('<4sIIIQQ20s')
+_no_source = (0, 0, bytes(20))
+
+DB_DIR = os.path.join(os.path.dirname(__file__), "Original Scripts", "TelltaleHashDBs")
+
+def index_path(db_name : str) -> str:
+    return os.path.join(DB_DIR, f"{db_name}.HashDB.idx")
+
+def hash_key(hash1 : int, hash2 : int) -> int:
+    return (hash1 << 32) | hash2
+
+def db_path(db_name : str) -> str:
+    return os.path.join(DB_DIR, f"{db_name}.HashDB")
+
+def file_sha1(path : str) -> bytes:
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).digest()
+
+def source_signature(path : str) -> tuple:
+    """(size, mtime_ns, sha1) of a .HashDB"""
+    st = os.stat(path)
+    return (st.st_size, st.st_mtime_ns, file_sha1(path))
+
+def parse_hashdb(data : bytes, verbose = False) -> dict:
+    """
+    Parse RTB's .HashDB blob into {(hash1, hash2): name}
+
+    Layout: uint32 count, then per entry uint32 hash2, uint32 hash1 and a
+    NUL-terminated name. Hash bytes may themselves be NUL, so names are cut
+    out one at a time with bytes.find rather than splitting the whole blob
+    """
+    pairs_num = struct.unpack_from('<I', data, 0)[0]
+    pair = struct.Struct('<II')
+    data_len = len(data)
+    db = {}
+    cursor = 4
+    for n in range(pairs_num):
+        if cursor + 9 > data_len:
+            break
+        hash2, hash1 = pair.unpack_from(data, cursor)
+        end = data.find(b"\0", cursor + 8)
+        if end < 0:
+            end = data_len
+        db[(hash1, hash2)] = data[cursor + 8:end].decode('cp1252', errors='replace')
+        cursor = end + 1
+    if verbose: print(f"Parsed {len(db)}/{pairs_num} hash-name pairs")
+    return db
+
+def load_db(db_name : str, verbose = True) -> dict:
+    """Read and parse a .HashDB from DB_DIR, {} if it doesn't exist"""
+    path = db_path(db_name)
+    if not os.path.isfile(path):
+        if verbose: print(f"{db_name}.HashDB not found in {DB_DIR}")
+        return {}
+    with open(path, "rb") as f:
+        data = f.read()
+    if verbose: print(f"Importing {db_name} @{path}")
+    return parse_hashdb(data, verbose)
+
+def write_index(db : dict, path : str, source = _no_source) -> int:
+    """Write a {(hash1, hash2): name} dict as an index file, returns entry count"""
+    keys = np.fromiter((hash_key(h1, h2) for h1, h2 in db), dtype='<u8', count=len(db))
+    names = [name.encode('utf-8') for name in db.values()]
+    order = np.argsort(keys, kind='stable')
+    names = [names[i] for i in order]
+    offsets = np.zeros(len(names) + 1, dtype='<u4')
+    np.cumsum([len(n) for n in names], out=offsets[1:])
+    blob = b"".join(names)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_header.pack(INDEX_MAGIC, INDEX_VERSION, len(names), len(blob), *source))
+        f.write(keys[order].tobytes())
+        f.write(offsets.tobytes())
+        f.write(blob)
+    os.replace(tmp_path, path)
+    return len(names)
+
+class HashNameIndex:
+    """
+    Read-only {(hash1, hash2): name} lookup backed by an index file
+
+    Behaves like the dicts load_db returns for get/[]/in/len
+    """
+
+    def __init__(self, path : str = None):
+        self.path = path
+        self._map = None
+        self.keys = np.zeros(0, dtype='<u8')
+        self.source = _no_source
+        if path is None:
+            return
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < _header.size:
+            self._map.close()
+            raise ValueError(f"{path} is not a version {INDEX_VERSION} hash index")
+        magic, version, count, blob_size, *source = _header.unpack_from(self._map, 0)
+        self.source = tuple(source)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a version {INDEX_VERSION} hash index")
+        pos = _header.size
+        self.keys = np.frombuffer(self._map, dtype='<u8', count=count, offset=pos)
+        pos += 8 * count
+        self.offsets = np.frombuffer(self._map, dtype='<u4', count=count + 1, offset=pos)
+        self._blob_start = pos + 4 * (count + 1)
+
+    def close(self):
+        """Drop the views and unmap the file (needed before it can be rewritten on Windows)"""
+        self.keys = np.zeros(0, dtype='<u8')
+        self.offsets = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def is_current(self, source_path : str) -> bool:
+        """
+        Whether this index was built from the current contents of source_path
+
+        Matching size and mtime are trusted as is, otherwise the file
+        is hashed so a touched but identical DB isn't rebuilt
+        """
+        size, mtime_ns, sha1 = self.source
+        st = os.stat(source_path)
+        if st.st_size != size:
+            return False
+        return st.st_mtime_ns == mtime_ns or file_sha1(source_path) == sha1
+
+    def _find(self, key) -> int:
+        """Position of (hash1, hash2) in the index, -1 if missing"""
+        k = np.uint64(hash_key(*key))
+        i = int(np.searchsorted(self.keys, k))
+        if i < len(self.keys) and self.keys[i] == k:
+            return i
+        return -1
+
+    def _name(self, i : int) -> str:
+        start = self._blob_start + int(self.offsets[i])
+        end = self._blob_start + int(self.offsets[i + 1])
+        return self._map[start:end].decode('utf-8')
+
+    def get(self, key, default=None):
+        i = self._find(key)
+        return default if i < 0 else self._name(i)
+
+    def __getitem__(self, key):
+        i = self._find(key)
+        if i < 0:
+            raise KeyError(key)
+        return self._name(i)
+
+    def __contains__(self, key):
+        return self._find(key) >= 0
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __bool__(self):
+        return len(self.keys) > 0
+
+# One shared instance per DB for the whole process
+_indexes = {}
+
+def get_index(db_name : str, rebuild = False, verbose = False) -> HashNameIndex:
+    """
+    Shared index for BoneNames/TexNames
+
+    Built from the .HashDB the first time, when the .HashDB changed since
+    the index was written, or when rebuild is set. Later calls just reuse
+    the open mapping. Missing DBs give an empty index
+    """
+    if not rebuild and db_name in _indexes:
+        return _indexes[db_name]
+    if db_name in _indexes:
+        _indexes.pop(db_name).close()
+    path = index_path(db_name)
+    source_path = db_path(db_name)
+    if not os.path.isfile(source_path):
+        if verbose: print(f"{db_name}.HashDB not found in {DB_DIR}")
+        _indexes[db_name] = HashNameIndex()
+        return _indexes[db_name]
+
+    index = None
+    if not rebuild and os.path.isfile(path):
+        try:
+            index = HashNameIndex(path)
+        except ValueError:
+            if verbose: print(f"Ignoring outdated index @{path}")
+        else:
+            if not index.is_current(source_path):
+                if verbose: print(f"{db_name}.HashDB changed since {path} was written")
+                index.close()
+                index = None
+    if index is None:
+        source = source_signature(source_path)
+        count = write_index(load_db(db_name, verbose), path, source)
+        if verbose: print(f"Wrote {db_name} index with {count} names @{path}")
+        index = HashNameIndex(path)
+    _indexes[db_name] = index
+    return index
+
+class NameResolver:
+    """
+    Collects the hashes a file needs while it's parsed and looks them all
+    up in one batch afterwards
+
+    db is a DB name (opened through get_index on first resolve), a mapping,
+    or None to keep every hash unresolved. verbose prints what opening
+    the DB's index does (building or loading it)
+    """
+
+    def __init__(self, db = None, verbose = False):
+        self.db = db
+        self.verbose = verbose
+        self.names = {}
+        self._pending = []
+        self.resolved_count = 0
+        self.resolve_ms = 0.0
+
+    def request(self, hash1 : int, hash2 : int) -> tuple:
+        """Register a hash, returns the key to look its name up with later"""
+        key = (hash1, hash2)
+        if key not in self.names:
+            self.names[key] = None
+            self._pending.append(key)
+        return key
+
+    def resolve(self) -> None:
+        """Look up every hash requested since the last call"""
+        if not self._pending:
+            return
+        start = time.perf_counter()
+        if isinstance(self.db, str):
+            self.db = get_index(self.db, verbose=self.verbose)
+        if self.db:
+            for key in self._pending:
+                name = self.db.get(key)
+                if name is not None:
+                    self.names[key] = name
+                    self.resolved_count += 1
+        self._pending = []
+        self.resolve_ms += (time.perf_counter() - start) * 1000
+
+    def name(self, key : tuple) -> str:
+        """Resolved name, or the hashes in hex if the DB doesn't know it"""
+        name = self.names.get(key)
+        return f"{key[0]:x}{key[1]:x}" if name is None else name
+
+    def summary(self) -> str:
+        return f"resolved {self.resolved_count}/{len(self.names)} names in {self.resolve_ms:.1f} ms"
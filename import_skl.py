@@ -1,5 +1,43 @@
+import bpy
+from .hashdb import NameResolver
+from .skl import parse_skl
+from .bpy_build import buildSkeleton
 
+def import_skl(filepath,
+               verbose = False,
+               bone_names : NameResolver = None,
+               collection : bpy.types.Collection = None,
+               trace_path = None,
+               ) -> list:
+    """Parse a .skl and build its armature, returns it linked to collection (the scene's by default)"""
+    skel = parse_skl(filepath, verbose=verbose, bone_names=bone_names, trace_path=trace_path)
+    if skel is None:
+        return []
+    return [buildSkeleton(skel, collection or bpy.context.scene.collection)]
 
-def import_skl():
-    pass
-    # Not Yet Implemented
\ No newline at end of file
+def bind_meshes(objs, armatures) -> int:
+    """
+    Give every skinned mesh in objs an Armature modifier for the armature
+    whose bones cover most of its vertex groups, returns how many were bound
+
+    Meshes that already have an Armature modifier are left alone
+    """
+    bone_sets = [(arm, set(arm.data.bones.keys())) for arm in armatures]
+    bound = 0
+    for obj in objs:
+        if obj.type != 'MESH' or not obj.vertex_groups:
+            continue
+        if any(mod.type == 'ARMATURE' for mod in obj.modifiers):
+            continue
+        groups = set(obj.vertex_groups.keys())
+        best, best_count = None, 0
+        for arm, bones in bone_sets:
+            count = len(groups & bones)
+            if count > best_count:
+                best, best_count = arm, count
+        if best is None:
+            continue
+        mod = obj.modifiers.new(name="Armature", type='ARMATURE')
+        mod.object = best
+        bound += 1
+    return bound
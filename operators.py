@@ -0,0 +1,625 @@
+import bpy
+import cProfile
+import itertools
+import os
+import pstats
+import tempfile
+import time
+import traceback
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from .import_d3dmesh import texture_dirs, import_lod0, build_lod, lod_count
+from .bpy_build import MeshInstances, buildD3DMesh, buildSkeleton
+from .import_skl import bind_meshes
+from .skl import parse_skl
+from .hashdb import NameResolver, HashNameIndex
+from .cache import MeshCache, load_d3dmesh
+from .textures import get_loader
+from .profiling import ImportProfile, ProfileSummary
+from bpy.props import StringProperty
+from bpy_extras.io_utils import ImportHelper
+from math import pi
+
+# Seconds of building per timer tick in a modal import, keeps the UI responsive
+BUILD_SLICE = 0.05
+# Files parsed ahead of the build in a modal import, bounds how many parsed meshes wait in memory
+PARSE_AHEAD = 4
+
+def _parse_safe(fpath : str, options : dict, profile : ImportProfile = None):
+    """
+    Parse one selected file: (kind, parsed data) or ("error", message), never raises
+
+    Runs in the parse worker thread, so it only gets plain values (the
+    options D3DMesh_ImportOperator._setup copies out), never the operator,
+    which may be gone by the time a cancelled import's last parse finishes
+    """
+    try:
+        match os.path.splitext(fpath)[1]:
+            case ".d3dmesh":
+                print(f"Processing {fpath}...")
+                return ("d3dmesh", load_d3dmesh(fpath, options["cache"], verbose=options["verbose"],
+                                                tex_names=options["tex_names"], bone_names=options["bone_names"],
+                                                trace_path=options["trace_path"], profile=profile))
+            case ".skl" if not options["parse_skeleton"]:
+                return ("error", "skipped, Import Skeleton Files is off")
+            case ".skl":
+                print(f"Processing {fpath}...")
+                return ("skl", parse_skl(fpath, verbose=options["verbose"], bone_names=options["bone_names"],
+                                         trace_path=options["trace_path"], profile=profile))
+    except Exception as e:
+        traceback.print_exc()
+        return ("error", f"{type(e).__name__}: {e}")
+    return ("error", "unsupported file type")
+
+class D3DMesh_ImportOperator(bpy.types.Operator, ImportHelper):
+    bl_idname = "import_scene.d3dmesh"
+    bl_label = "Import D3DMesh"
+    bl_options = {'REGISTER', 'PRESET'}
+    # WOAS: I hate how blender api online docs don't have ImportHelper templates or any explanation 
+    # so you have to dig through templates built into blender's text editor
+
+    directory: bpy.props.StringProperty(subtype='FILE_PATH', options={'SKIP_SAVE', 'HIDDEN'})
+    files: bpy.props.CollectionProperty(type=bpy.types.OperatorFileListElement, options={'SKIP_SAVE', 'HIDDEN'})
+
+    rotation : bpy.props.FloatVectorProperty(
+        name="Rotation",
+        subtype='EULER',
+        unit='ROTATION',
+        default=(pi/2,0,0)
+    )
+
+    scale : bpy.props.FloatVectorProperty(
+        name="Scale",
+        default=(1,1,1)
+    )
+
+    parse_skeleton : bpy.props.BoolProperty(
+        name="Import Skeleton Files",
+        default=False,
+        description="Build an armature from every selected skeleton file (*.skl) and bind the meshes imported with it.\nAlso names vertex groups after the bones in the Bone Names DB"
+    )
+
+    parse_materials : bpy.props.BoolProperty(
+        name="Parse Materials",
+        default=False,
+        description="Create a material per Telltale material (shared between every imported file)"
+    )
+
+    parse_textures : bpy.props.BoolProperty(
+        name="Parse Textures",
+        default=False,
+        description="Load each material's textures from the texture folder set in the add-on preferences, the mesh's folder or a Textures folder next to it"
+    )
+
+    uv_layers : bpy.props.EnumProperty(
+        name="UV Layers",
+        items=[
+            ("MERGE",   "Merge", "Every UV layer goes on the same mesh", 0),
+            ("SPLIT",   "Split", "UV1 goes on the mesh, every additional UV layer gets its own copy of the mesh", 1),
+            ("NO",      "Ignore UVs", "Don't import UVs", 2)
+        ],
+        default='NO',
+    )
+    
+    parse_lods: bpy.props.BoolProperty(
+        name="Parse LODs",
+        description="If unchecked only first LOD is going to be imported",
+        default=False,
+    )
+
+    lazy_lods: bpy.props.BoolProperty(
+        name="Load LODs On Demand",
+        description="Only build LOD0, other LODs can be built later from the Object menu (read straight from the file)",
+        default=False,
+    )
+
+    join_submeshes: bpy.props.BoolProperty(
+        name="Join Submeshes",
+        description="",
+        default=False,
+    )
+
+    instance_meshes: bpy.props.BoolProperty(
+        name="Instance Duplicate Meshes",
+        description="Meshes with the same geometry, skinning and materials as one imported before (in the same import) share its mesh data, like Alt+D duplicates\n\
+Editing one edits all of them",
+        default=True,
+    )
+
+    early_game_fix : bpy.props.EnumProperty(
+        name="Early Game Fix",
+        items=[
+            ("OLD",         "Texas Hold'em / Bone / CSI 3/4 / Sam and Max S1/S2 (Ep. 1/2)",""),
+            ("SM2-34",      "Sam and Max Season 2 (Ep. 3/4)",""),
+		    ("SM2-5",       "Sam and Max Season 2 (Ep. 5 - What's New, Beelzebub?)",""),
+            ("SBCG4AP-1",   "Strong Bad's CG4AP (Ep. 1 - Homestar Ruiner)",""),
+            ("SBCG4AP-2",   "Strong Bad's CG4AP (Ep. 2 - Strong Badia the Free)",""),
+            ("SBCG4AP-3",   "Strong Bad's CG4AP (Ep. 3 - Baddest of the Bands)",""),
+            ("SBCG4AP-4",   "Strong Bad's CG4AP (Ep. 4 - Dangeresque 3)",""),
+            ("SBCG4AP-5",   "Strong Bad's CG4AP (Ep. 5 - 8-Bit is Enough)",""),
+            ("WG",          "Wallace and Gromit (Ep. 1-3)",""),
+        ],
+        description="Early Game Fix\nNot Yet Implemented"
+    )
+
+    verbose: bpy.props.BoolProperty(
+        name="Verbose Console Output",
+        description="Output extra info to the console\nMay slow down operation",
+        default=False,
+    )
+
+    profile_import: bpy.props.BoolProperty(
+        name="Profile Import",
+        description="Time, bytes and peak memory of every parser section and build stage, printed as a table and saved as CSV (see the add-on preferences)\n\
+Tracing memory slows the import down, profiled imports run in one go",
+        default=False,
+    )
+
+    python_profile: bpy.props.BoolProperty(
+        name="Python Profiler (cProfile)",
+        description="Run the import under cProfile, prints the slowest functions and saves a .prof file next to the profile CSV\n\
+Profiled imports run in one go",
+        default=False,
+    )
+    
+    filter_glob: StringProperty(
+        default="*.d3dmesh;*.skl",
+        options={'HIDDEN'},
+        maxlen=255,  # Max internal buffer length, longer would be clamped.
+    )
+
+    def execute(self, context):
+        if not self.directory:
+            return {'CANCELLED'}
+        self._setup(context)
+        if bpy.app.background or context.window is None or self._summary is not None or self._profiler is not None:
+            # Scripts, background mode and profiling: everything in one go
+            if self._profiler: self._profiler.enable()
+            for fpath in self._paths:
+                profile = self._new_profile(fpath)
+                self._import(context, fpath, _parse_safe(fpath, self._parse_options, profile), profile)
+            if self._profiler: self._profiler.disable()
+            return self._finish(context)
+        # Parse in a worker thread while the timer builds (bpy is main thread only) what's ready in short slices
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="d3dmesh_parse")
+        self._queue = iter(self._paths)
+        self._pending = []
+        self._submit_next()
+        wm = context.window_manager
+        wm.progress_begin(0, len(self._paths))
+        self._timer = wm.event_timer_add(0.05, window=context.window)
+        wm.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            self._stop(context)
+            self._bind()
+            self.report({'WARNING'}, f"Import cancelled, {self._done}/{len(self._paths)} files imported")
+            return {'CANCELLED'}
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+        deadline = time.perf_counter() + BUILD_SLICE
+        while self._pending and self._pending[0][1].done() and time.perf_counter() < deadline:
+            fpath, future = self._pending.pop(0)
+            self._submit_next()
+            self._import(context, fpath, future.result())
+        elapsed = time.perf_counter() - self._start
+        context.window_manager.progress_update(self._done)
+        context.workspace.status_text_set(f"Importing {self._done}/{len(self._paths)} files "
+                                          f"({self._done / elapsed if elapsed else 0:.1f} files/s), Esc to cancel")
+        if self._pending:
+            return {'RUNNING_MODAL'}
+        self._stop(context)
+        return self._finish(context)
+
+    def _setup(self, context):
+        """Import state, and everything the parse needs as plain values (the worker thread mustn't touch bpy or the operator)"""
+        # Names are looked up lazily, only for the hashes the files actually use
+        self._tex_names = NameResolver("TexNames" if (self.parse_textures or self.parse_materials) else None, verbose=self.verbose)
+        self._bone_names = NameResolver("BoneNames" if self.parse_skeleton else None, verbose=self.verbose)
+        self._prefs = context.preferences.addons[__package__].preferences
+        self._cache = self._prefs.get_cache()
+        self._parse_options = {
+            "cache": self._cache,
+            "verbose": self.verbose,
+            "tex_names": self._tex_names,
+            "bone_names": self._bone_names,
+            "trace_path": bpy.path.abspath(self._prefs.parse_trace_file) or None,
+            "parse_skeleton": self.parse_skeleton,
+        }
+        self._textures = get_loader(bpy.path.abspath(self._prefs.texture_root), verbose=self.verbose) if self.parse_textures else None
+        self._lod_options = {
+            "join_submeshes": self.join_submeshes,
+            "uv_layers": self.uv_layers,
+            "parse_materials": self.parse_materials or self.parse_textures,
+            "parse_textures": self.parse_textures,
+            "instance_meshes": self.instance_meshes,
+        }
+        self._instances = MeshInstances() if self.instance_meshes else None
+        self._paths = [os.path.join(self.directory, f.name) for f in self.files]
+        self._done = 0
+        self._failed = []
+        self._objects = []
+        self._armatures = []
+        self._summary = None
+        self._traced = False
+        if self.profile_import:
+            self._summary = ProfileSummary()
+            # Traced for the whole import, not per file
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._traced = True
+        self._profiler = cProfile.Profile() if self.python_profile else None
+        self._start = time.perf_counter()
+
+    def _submit_next(self):
+        """Queue parses until PARSE_AHEAD files are parsing or waiting to be built"""
+        for fpath in itertools.islice(self._queue, PARSE_AHEAD - len(self._pending)):
+            self._pending.append((fpath, self._executor.submit(_parse_safe, fpath, self._parse_options)))
+
+    def _new_profile(self, fpath) -> ImportProfile:
+        """Profile of one file's import when profiling, else None"""
+        if self._summary is None:
+            return None
+        profile = ImportProfile(fpath)
+        self._summary.add(profile)
+        return profile
+
+    def _import(self, context, fpath, parsed, profile : ImportProfile = None):
+        """Build one parsed file into the scene (main thread)"""
+        self._done += 1
+        kind, data = parsed
+        new_objs = []
+        try:
+            match kind:
+                case "d3dmesh" if data is None:
+                    self._failed.append((fpath, "unsupported version or no geometry"))
+                case "d3dmesh":
+                    if self._textures: self._textures.prefetch(data, texture_dirs(fpath))
+                    if self.lazy_lods:
+                        new_objs = import_lod0(data, fpath, self._lod_options, self._textures, profile, self._instances)
+                    else:
+                        new_objs = buildD3DMesh(data,
+                                                parse_lods=self.parse_lods,
+                                                join_submeshes=self.join_submeshes,
+                                                uv_layers=self.uv_layers,
+                                                parse_materials=self._lod_options["parse_materials"],
+                                                textures=self._textures,
+                                                texture_dirs=texture_dirs(fpath),
+                                                profile=profile,
+                                                instances=self._instances)
+                case "skl" if data is None:
+                    self._failed.append((fpath, "unsupported skeleton header"))
+                case "skl":
+                    armature = buildSkeleton(data, context.scene.collection)
+                    self._armatures.append(armature)
+                    new_objs = [armature]
+                case "error":
+                    self._failed.append((fpath, data))
+        except Exception as e:
+            traceback.print_exc()
+            self._failed.append((fpath, f"build: {type(e).__name__}: {e}"))
+        if profile is not None:
+            profile.close()
+        for new_obj in new_objs:
+            match type(new_obj):
+                case bpy.types.Object:              
+                    # Armatures are already linked, edit mode needs them in the scene
+                    if new_obj.name not in context.scene.collection.objects:
+                        context.scene.collection.objects.link(new_obj)
+                    self._objects.append(new_obj)
+                    new_obj.rotation_euler = self.rotation
+                    new_obj.scale = self.scale
+                case _:
+                    print(new_obj)
+
+    def _stop(self, context):
+        wm = context.window_manager
+        wm.event_timer_remove(self._timer)
+        wm.progress_end()
+        context.workspace.status_text_set(None)
+        # Queued parses are dropped, one already running finishes in the background (it only holds plain options)
+        for fpath, future in self._pending:
+            future.cancel()
+        self._pending = []
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _bind(self):
+        """Skinned meshes of this import get an Armature modifier for the skeleton imported with them"""
+        if self._armatures:
+            print(f"Skeletons: {len(self._armatures)} built, {bind_meshes(self._objects, self._armatures)} meshes bound")
+
+    def _report_profiles(self):
+        """Print the profile table and cProfile's slowest functions, save them next to each other"""
+        if self._summary is None and self._profiler is None:
+            return
+        csv_path = bpy.path.abspath(self._prefs.profile_csv_file) or os.path.join(tempfile.gettempdir(), "d3dmesh_import_profile.csv")
+        if self._summary is not None:
+            if self._traced:
+                tracemalloc.stop()
+            print(self._summary.table())
+            try:
+                print(f"Profile saved to {self._summary.write_csv(csv_path)}")
+            except OSError as e:
+                print(f"Couldn't save the profile to {csv_path}: {e}")
+        if self._profiler is not None:
+            pstats.Stats(self._profiler).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(25)
+            prof_path = os.path.splitext(csv_path)[0] + ".prof"
+            try:
+                self._profiler.dump_stats(prof_path)
+                print(f"cProfile stats saved to {prof_path}")
+            except OSError as e:
+                print(f"Couldn't save the cProfile stats to {prof_path}: {e}")
+
+    def _finish(self, context):
+        self._bind()
+        for db_label, resolver in (("texture", self._tex_names), ("bone", self._bone_names)):
+            if resolver.names:
+                print(f"{db_label.capitalize()} DB: {resolver.summary()}")
+        if self._cache: print(f"Parse cache: {self._cache.summary()}")
+        if self._textures: print(f"Textures: {self._textures.summary()}")
+        if self._instances: print(f"Meshes: {self._instances.summary()}")
+        if isinstance(self._tex_names.db, HashNameIndex): self._prefs.tex_names_cached_amt = len(self._tex_names.db)
+        if isinstance(self._bone_names.db, HashNameIndex): self._prefs.bone_names_cached_amt = len(self._bone_names.db)
+
+        self._report_profiles()
+
+        elapsed = time.perf_counter() - self._start
+        print(f"Imported {self._done - len(self._failed)}/{len(self._paths)} files in {elapsed:.1f} s")
+        for fpath, error in self._failed:
+            print(f"  {fpath}: {error}")
+        if self._failed:
+            self.report({'WARNING'}, f"{len(self._failed)} files failed to import, see the console")
+        else:
+            self.report({'INFO'}, "Finished!")
+        return {"FINISHED"}
+    
+    
+    def draw(self, context):
+        layout = self.layout
+        box = layout.box()
+        box.label(text="Supports selecting multiple files", icon='DOCUMENTS')
+        layout.prop(self, "rotation")
+        layout.prop(self, "scale")
+        layout.prop(self, "parse_materials", icon='MATERIAL_DATA')
+        layout.prop(self, "parse_textures", icon='TEXTURE')
+        r = layout.row()
+        r.label(text="UV Layers: ", icon='UV_DATA')
+        r.prop(self, "uv_layers", text="")
+        layout.prop(self, "join_submeshes", icon='STICKY_UVS_LOC')
+        layout.prop(self, "instance_meshes", icon='LINKED')
+        r = layout.row()
+        r.prop(self, "parse_lods", icon='MOD_MULTIRES')
+        r.enabled = not self.lazy_lods
+        layout.prop(self, "lazy_lods", icon='TIME')
+        layout.prop(self, "parse_skeleton", icon='ARMATURE_DATA')
+        r = layout.row()
+        r.label(text="Early Game Fix:", icon='GHOST_DISABLED')
+        r.prop(self, "early_game_fix", text="")
+        r.enabled = False
+        layout.prop(self, "verbose", icon='CONSOLE')
+        layout.prop(self, "profile_import", icon='SORTTIME')
+        layout.prop(self, "python_profile", icon='SCRIPT')
+        cache_box = layout.box()
+        cache_box = cache_box.column()
+
+        bone_names_cached_amt  =   context.preferences.addons[__package__].preferences.bone_names_cached_amt
+        tex_names_cached_amt =      context.preferences.addons[__package__].preferences.tex_names_cached_amt
+
+        if bone_names_cached_amt == 0:
+            cache_box.label(text="Bone Names DB not loaded",icon='CHECKBOX_DEHLT')
+        else:
+            cache_box.label(text=f"Bone Names DB loaded ({bone_names_cached_amt}) items)",icon='CHECKBOX_HLT')
+
+        if tex_names_cached_amt == 0:
+            cache_box.label(text="Texture Names DB not loaded",icon='CHECKBOX_DEHLT')
+        else:
+            cache_box.label(text=f"Texture Names DB loaded ({tex_names_cached_amt} items)",icon='CHECKBOX_HLT')
+
+        cache_box.operator("import.ttg_hashdb", icon='IMPORT')
+
+
+
+class Build_d3dmesh_lod(bpy.types.Operator):
+    bl_idname = "object.ttg_build_d3dmesh_lod"
+    bl_label = "Build D3DMesh LOD"
+    bl_description = "Build another LOD of the active object's .d3dmesh, reading only that LOD from the file\n\
+Works on objects imported with Load LODs On Demand"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    lod : bpy.props.IntProperty(
+        name="LOD",
+        default=1,
+        min=0,
+    )
+
+    @classmethod
+    def poll(cls, context):
+        return context.active_object is not None and lod_count(context.active_object) > 0
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        source = context.active_object
+        count = lod_count(source)
+        if self.lod >= count:
+            self.report({'WARNING'}, f"{source.name} only has {count} LODs")
+            return {'CANCELLED'}
+        instances = MeshInstances()
+        try:
+            new_objs = build_lod(source, self.lod, instances=instances)
+        except (OSError, ValueError) as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        for new_obj in new_objs:
+            for collection in source.users_collection:
+                collection.objects.link(new_obj)
+            new_obj.matrix_world = source.matrix_world
+        instanced = f", {instances.instanced} sharing a mesh" if instances.instanced else ""
+        self.report({'INFO'}, f"Built LOD #{self.lod} ({len(new_objs)} objects{instanced})")
+        return {"FINISHED"}
+
+
+class Manual_db_import(bpy.types.Operator):
+    bl_idname = "import.ttg_hashdb"
+    bl_label = "Manually Load Databases"
+    bl_description = "Hash databases are converted to a compact index file on first import automatically\n\
+This operator is made to force rebuild the indexes (in case RTB updates the databases)\n\
+Keep in mind rebuilding takes some time"
+
+    def execute(self, context):
+        context.preferences.addons[__package__].preferences.load_databases(force = True)
+        return {"FINISHED"}
+
+
+class Clear_parse_cache(bpy.types.Operator):
+    bl_idname = "import.ttg_clear_parse_cache"
+    bl_label = "Clear Parse Cache"
+    bl_description = "Delete every cached .d3dmesh parse"
+
+    def execute(self, context):
+        context.preferences.addons[__package__].preferences.get_cache().clear()
+        return {"FINISHED"}
+
+
+class Rebuild_texture_index(bpy.types.Operator):
+    bl_idname = "import.ttg_rebuild_texture_index"
+    bl_label = "Rebuild Texture Index"
+    bl_description = "Scan the texture folder again (needed after textures are added, moved or deleted)"
+
+    def execute(self, context):
+        prefs = context.preferences.addons[__package__].preferences
+        root = bpy.path.abspath(prefs.texture_root)
+        if not os.path.isdir(root):
+            self.report({'WARNING'}, "Texture folder not set")
+            return {'CANCELLED'}
+        textures = get_loader(root, rebuild=True, verbose=True)
+        self.report({'INFO'}, f"Indexed {len(textures.index)} textures in {textures.index.build_ms:.0f} ms")
+        return {"FINISHED"}
+
+
+class AddonPreferences(bpy.types.AddonPreferences):
+    bl_idname = __package__
+
+    bone_names_cached_amt : bpy.props.IntProperty(default=0)
+    tex_names_cached_amt : bpy.props.IntProperty(default=0)
+
+    use_parse_cache : bpy.props.BoolProperty(
+        name="Cache Parsed Meshes",
+        default=True,
+        description="Keep parsed .d3dmesh data on disk so re-importing unchanged files skips parsing"
+    )
+
+    parse_cache_dir : bpy.props.StringProperty(
+        name="Cache Folder",
+        subtype='DIR_PATH',
+        default="",
+        description="Where parsed meshes are cached (empty = ParseCache inside the add-on folder)"
+    )
+
+    parse_cache_max_mb : bpy.props.IntProperty(
+        name="Cache Size (MB)",
+        default=1024,
+        min=16,
+        description="Least recently used entries are deleted once the cache grows past this"
+    )
+
+    parse_trace_file : bpy.props.StringProperty(
+        name="Parse Trace File",
+        subtype='FILE_PATH',
+        default="",
+        description="Append a JSON line per parsed section (offset, length, time) and per file outcome to this file, for looking into files that fail to import (empty = off)"
+    )
+
+    profile_csv_file : bpy.props.StringProperty(
+        name="Profile CSV File",
+        subtype='FILE_PATH',
+        default="",
+        description="Where Profile Import saves its table (empty = d3dmesh_import_profile.csv in the temp folder), the cProfile stats go next to it as .prof"
+    )
+
+    texture_root : bpy.props.StringProperty(
+        name="Texture Folder",
+        subtype='DIR_PATH',
+        default="",
+        description="Folder with the game's extracted textures (searched recursively, indexed once)"
+    )
+
+    def get_cache(self):
+        if not self.use_parse_cache:
+            return None
+        return MeshCache(bpy.path.abspath(self.parse_cache_dir) or None, self.parse_cache_max_mb << 20)
+    
+    def load_databases(self, force = False):
+        from .hashdb import get_index
+        self.bone_names_cached_amt = len(get_index("BoneNames", rebuild=force, verbose=True))
+        self.tex_names_cached_amt = len(get_index("TexNames", rebuild=force, verbose=True))
+
+    def get_bone_database(self):
+        from .hashdb import get_index
+        return get_index("BoneNames")
+    
+    def get_tex_database(self):
+        from .hashdb import get_index
+        return get_index("TexNames")
+
+    def draw(self, context):
+        layout = self.layout
+        cache_box = layout.column()
+        
+        bone_names_cached_amt = self.bone_names_cached_amt
+        tex_names_cached_amt = self.tex_names_cached_amt
+
+        if bone_names_cached_amt == 0:
+            cache_box.label(text="Bone Names DB not loaded",icon='CHECKBOX_DEHLT')
+        else:
+            cache_box.label(text=f"Bone Names DB loaded ({bone_names_cached_amt}) items)",icon='CHECKBOX_HLT')
+
+        if tex_names_cached_amt == 0:
+            cache_box.label(text="Texture Names DB not loaded",icon='CHECKBOX_DEHLT')
+        else:
+            cache_box.label(text=f"Texture Names DB loaded ({tex_names_cached_amt} items)",icon='CHECKBOX_HLT')
+
+        cache_box.operator("import.ttg_hashdb", icon='IMPORT')
+
+        parse_box = layout.box().column()
+        parse_box.prop(self, "use_parse_cache", icon='FILE_CACHE')
+        r = parse_box.column()
+        r.prop(self, "parse_cache_dir")
+        r.prop(self, "parse_cache_max_mb")
+        r.operator("import.ttg_clear_parse_cache", icon='TRASH')
+        r.enabled = self.use_parse_cache
+
+        layout.prop(self, "parse_trace_file", icon='TEXT')
+        layout.prop(self, "profile_csv_file", icon='SORTTIME')
+
+        texture_box = layout.box().column()
+        texture_box.prop(self, "texture_root")
+        texture_box.operator("import.ttg_rebuild_texture_index", icon='FILE_REFRESH')
+    
+
+
+
+classes_to_register = [D3DMesh_ImportOperator, Build_d3dmesh_lod, Manual_db_import, Clear_parse_cache, Rebuild_texture_index, AddonPreferences]
+
+def menu_func_import(self, context):
+    self.layout.operator(D3DMesh_ImportOperator.bl_idname, text="D3DMesh (.d3dmesh)")
+
+def menu_func_object(self, context):
+    self.layout.operator(Build_d3dmesh_lod.bl_idname)
+
+def register():
+    for cls in classes_to_register:
+        bpy.utils.register_class(cls)
+    
+    bpy.types.TOPBAR_MT_file_import.append(menu_func_import)
+    bpy.types.VIEW3D_MT_object.append(menu_func_object)
+
+
+def unregister():
+    for cls in classes_to_register:
+        bpy.utils.unregister_class(cls)
+    bpy.types.TOPBAR_MT_file_import.remove(menu_func_import)
+    bpy.types.VIEW3D_MT_object.remove(menu_func_object)
@@ -0,0 +1,141 @@
+import csv
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Import profiling
+#
+# An ImportProfile collects wall time, bytes and peak Python allocation
+# (tracemalloc, when memory is on) per stage of one file's import: every
+# parser section (fed by the Tracer, bytes = the section's length in the
+# file), cache lookups and every build stage (bytes = size of the arrays
+# handed over). Stages with the same name add up.
+#
+# ProfileSummary gathers the profiles of a whole import into one table,
+# printed at the end and written as CSV
+
+class StageBytes:
+    """Bytes a stage consumed or produced, can be set inside its with block"""
+    __slots__ = ("nbytes",)
+
+    def __init__(self, nbytes : int = 0):
+        self.nbytes = nbytes
+
+class ImportProfile:
+    """Per-stage wall time, bytes and allocation peak of one file's import"""
+
+    def __init__(self, filepath : str = "", memory = True):
+        self.filepath = filepath
+        self.memory = memory
+        self.stages = {}        # name -> [calls, ms, bytes, peak bytes]
+        self._current = None    # (name, start time, traced memory at start)
+        self._started_tracing = False
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def start(self, name : str):
+        """Start timing a stage, ending the one still running"""
+        self.stop()
+        traced = 0
+        if self.memory:
+            tracemalloc.reset_peak()
+            traced = tracemalloc.get_traced_memory()[0]
+        self._current = (name, time.perf_counter(), traced)
+
+    def stop(self, nbytes : int = 0):
+        """End the running stage (if any), nbytes is what it consumed or produced"""
+        if self._current is None:
+            return
+        name, start, traced = self._current
+        ms = (time.perf_counter() - start) * 1000
+        peak = max(tracemalloc.get_traced_memory()[1] - traced, 0) if self.memory else 0
+        self._current = None
+        self.add(name, ms, nbytes, peak)
+
+    def add(self, name : str, ms : float, nbytes : int = 0, peak : int = 0):
+        stage = self.stages.setdefault(name, [0, 0.0, 0, 0])
+        stage[0] += 1
+        stage[1] += ms
+        stage[2] += nbytes
+        stage[3] = max(stage[3], peak)
+
+    @contextmanager
+    def stage(self, name : str, nbytes : int = 0):
+        """Time the with block as a stage, yields its StageBytes"""
+        counter = StageBytes(nbytes)
+        self.start(name)
+        try:
+            yield counter
+        finally:
+            self.stop(counter.nbytes)
+
+    def close(self):
+        """End the running stage and stop tracemalloc if this profile started it"""
+        self.stop()
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @property
+    def total_ms(self) -> float:
+        return sum(stage[1] for stage in self.stages.values())
+
+    def rows(self) -> list[dict]:
+        return [{"file": self.filepath, "stage": name, "calls": calls, "ms": round(ms, 3), "bytes": nbytes, "peak_bytes": peak}
+                for name, (calls, ms, nbytes, peak) in self.stages.items()]
+
+@contextmanager
+def profile_stage(profile : ImportProfile, name : str, nbytes : int = 0):
+    """profile.stage, or nothing (but the StageBytes) when profile is None"""
+    if profile is None:
+        yield StageBytes(nbytes)
+        return
+    with profile.stage(name, nbytes) as counter:
+        yield counter
+
+class ProfileSummary:
+    """Profiles of every file of an import, aggregated per stage"""
+
+    def __init__(self):
+        self.profiles = []
+
+    def add(self, profile : ImportProfile):
+        self.profiles.append(profile)
+
+    def totals(self) -> dict:
+        """stage -> [files, calls, ms, bytes, max peak bytes], in first-seen order"""
+        totals = {}
+        for profile in self.profiles:
+            for name, (calls, ms, nbytes, peak) in profile.stages.items():
+                total = totals.setdefault(name, [0, 0, 0.0, 0, 0])
+                total[0] += 1
+                total[1] += calls
+                total[2] += ms
+                total[3] += nbytes
+                total[4] = max(total[4], peak)
+        return totals
+
+    def table(self) -> str:
+        totals = self.totals()
+        all_ms = sum(total[2] for total in totals.values()) or 1
+        lines = [f"{'stage':<24}{'files':>6}{'ms':>11}{'%':>6}{'MB':>9}{'MB/s':>9}{'peak MB':>9}"]
+        for name, (files, calls, ms, nbytes, peak) in totals.items():
+            mb = nbytes / (1 << 20)
+            mb_s = f"{mb / (ms / 1000):.1f}" if nbytes and ms > 0 else "-"
+            lines.append(f"{name:<24}{files:>6}{ms:>11.1f}{ms / all_ms:>6.0%}{mb:>9.2f}{mb_s:>9}{peak / (1 << 20):>9.2f}")
+        lines.append(f"{'total':<24}{len(self.profiles):>6}{all_ms:>11.1f}")
+        return "\n".join(lines)
+
+    def write_csv(self, path : str) -> str:
+        """Every file's stages, then the per-stage totals (file "(all)"), returns path"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=("file", "stage", "calls", "ms", "bytes", "peak_bytes"))
+            writer.writeheader()
+            for profile in self.profiles:
+                writer.writerows(profile.rows())
+            for name, (files, calls, ms, nbytes, peak) in self.totals().items():
+                writer.writerow({"file": "(all)", "stage": name, "calls": calls, "ms": round(ms, 3), "bytes": nbytes, "peak_bytes": peak})
+        return path
@@ -0,0 +1,216 @@
+"""
+Blender-independent .skl (skeleton) parser
+
+parse_skl reads a skeleton's bone table into a D3DSkeleton of NumPy
+arrays (hashes, parent indices, local rest transforms), world_matrices
+composes them into world space. Nothing here imports bpy
+"""
+
+import logging
+import os
+from dataclasses import dataclass, field
+from .wbr import WBR
+from .hashdb import NameResolver
+from .trace import RECORD, Tracer, console_logging
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+# Bone entry, as read by the reference (version 18+ layout)
+#   0x00 bone hash, parent hash (hash2 first, like everywhere else)
+#   0x10 parent index (-1 for roots)
+#   0x14 3 unknown floats
+#   0x20 local position, local rotation quaternion (x, y, z, w)
+#   0x3C rest transform block: length, quaternion, position
+#   0x5C 3 x 3 floats (translation scales)
+#   0x80 IK block: length, count
+# followed by two variable length blocks:
+#   IK entries, count x (hash, float influence)
+#   "pi" block: length, count, count x 3 floats, then a header long and 7 floats
+_bone_record = np.dtype([
+    ("hash2", "<u4"), ("hash1", "<u4"),
+    ("parent_hash2", "<u4"), ("parent_hash1", "<u4"),
+    ("parent", "<i4"),
+    ("unknown", "<f4", 3),
+    ("position", "<f4", 3),
+    ("rotation", "<f4", 4),
+    ("rest_length", "<u4"),
+    ("rest_rotation", "<f4", 4),
+    ("rest_position", "<f4", 3),
+    ("scales", "<f4", (3, 3)),
+    ("ik_length", "<u4"),
+    ("ik_count", "<u4"),
+])
+_ik_entry_size = 12
+_pi_entry_size = 12
+_pi_tail_size = 4 + 7 * 4
+
+@dataclass(slots=True)
+class D3DSkeleton:
+    name : str
+    header : str                # MSV5/MSV6
+    bone_hashes : list          # (hash1, hash2) per bone, same keys the mesh LOD bone palettes use
+    parents : np.ndarray        # (N,) int32 parent bone index, -1 for roots
+    positions : np.ndarray      # (N,3) float32 local rest position
+    rotations : np.ndarray      # (N,4) float32 local rest rotation (x, y, z, w)
+    bone_names : list = field(default_factory=list)  # bone_hashes resolved through the BoneNames DB
+
+    @property
+    def bone_count(self) -> int:
+        return len(self.bone_hashes)
+
+def parse_skl(filepath,
+              verbose = False,
+              bone_names : NameResolver = None,
+              trace_path : str = None,
+              profile = None,
+              ) -> D3DSkeleton:
+    """
+    Parse a .skl, None if its header isn't a supported one
+
+    Bone hashes are looked up in bone_names once the whole table has been
+    read. verbose, trace_path and profile work like parse_d3dmesh's
+    """
+    console_logging(log, verbose)
+    f = WBR(open(filepath, 'rb'))
+    tr = Tracer(log, filepath, trace_path, profile)
+    try:
+        result = _parse_skl(f, tr, filepath, bone_names)
+    except Exception as e:
+        tr.finish(f.tell(), f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        f.close()
+    tr.finish(f.tell(), "ok" if result is not None else "unsupported")
+    return result
+
+def _parse_skl(f : WBR, tr : Tracer, filepath, bone_names : NameResolver):
+    bone_names = bone_names or NameResolver()
+
+    tr.section("Header start @%d", f.tell(), name="Header", offset=f.tell())
+    HeaderMagic = f.readLong().to_bytes(4).decode('ascii', errors='replace')
+    tr.record("HeaderMagic = %s", HeaderMagic)
+    if HeaderMagic not in ("MSV5", "MSV6"):
+        tr.warning("%s: skeleton header %s not supported (only MSV5/MSV6 are)", filepath, HeaderMagic)
+        return None
+    FileSize = f.readLong()
+    tr.record("FileSize = %d", FileSize)
+    f.seek_rel(0x08)
+    ParamCount = f.readLong()
+    tr.record("ParamCount = %d", ParamCount)
+    f.seek_rel(0x0C * ParamCount)
+
+    tr.section("Bones start @%d", f.tell(), name="Bones", offset=f.tell())
+    BoneFileSize = f.readLong()
+    BoneCount = f.readLong()
+    tr.record("BoneFileSize = %d, BoneCount = %d", BoneFileSize, BoneCount)
+    # Every entry is at least its fixed part, garbage counts fail here instead of allocating/walking for ages
+    left = f.size - f.tell()
+    if BoneCount * _bone_record.itemsize > left:
+        raise ValueError(f"BoneCount = {BoneCount} @{f.tell()} doesn't fit in the {left} bytes left of the file")
+
+    # Entries aren't fixed size, so only walk the block counts to find where each one starts
+    table_start = f.tell()
+    starts = np.empty(BoneCount, dtype=np.int64)
+    pos = table_start
+    for b in range(BoneCount):
+        starts[b] = pos
+        if pos + _bone_record.itemsize > f.size:
+            raise ValueError(f"bone #{b} starts past the end of the file @{pos}")
+        f.seek_abs(pos + _bone_record.itemsize - 4)
+        IKAmount = f.readLong()
+        f.seek_rel(_ik_entry_size * IKAmount + 4)
+        PiAmount = f.readLong()
+        pos = f.tell() + _pi_entry_size * PiAmount + _pi_tail_size
+        tr.element("Bone #%d @%d: IKAmount = %d, PiAmount = %d", b, starts[b], IKAmount, PiAmount)
+    if pos > f.size:
+        raise ValueError(f"bone table runs past the end of the file ({pos} > {f.size})")
+    f.seek_abs(table_start)
+    table = f.readArray(np.uint8, pos - table_start)
+    f.seek_abs(pos)
+
+    # One gather for every entry's fixed part
+    gather = (starts - table_start)[:, None] + np.arange(_bone_record.itemsize)
+    bones = np.ascontiguousarray(table[gather]).view(_bone_record).reshape(-1)
+
+    parents = bones["parent"].astype(np.int32)
+    parents[(parents < 0) | (parents >= BoneCount)] = -1
+    bone_hashes = [bone_names.request(h1, h2) for h1, h2 in zip(bones["hash1"].tolist(), bones["hash2"].tolist())]
+    bone_names.resolve()
+
+    skel = D3DSkeleton(name=os.path.splitext(os.path.basename(filepath))[0],
+                       header=HeaderMagic,
+                       bone_hashes=bone_hashes,
+                       parents=parents,
+                       positions=bones["position"].astype(np.float32),
+                       rotations=bones["rotation"].astype(np.float32))
+    skel.bone_names = [bone_names.name(key) for key in bone_hashes]
+    if log.isEnabledFor(RECORD):
+        for b in range(BoneCount):
+            tr.record("Bone #%d %s, parent %d", b, skel.bone_names[b], parents[b])
+    return skel
+
+def quat_matrices(quats : np.ndarray) -> np.ndarray:
+    """(N,4) x, y, z, w quaternions to (N,3,3) rotation matrices, zero quaternions become identity"""
+    q = np.asarray(quats, dtype=np.float64)
+    norm = np.linalg.norm(q, axis=1, keepdims=True)
+    q = np.where(norm > 0, q / np.where(norm > 0, norm, 1), [0, 0, 0, 1])
+    x, y, z, w = q.T
+    return np.stack([
+        1 - 2*(y*y + z*z), 2*(x*y - z*w),     2*(x*z + y*w),
+        2*(x*y + z*w),     1 - 2*(x*x + z*z), 2*(y*z - x*w),
+        2*(x*z - y*w),     2*(y*z + x*w),     1 - 2*(x*x + y*y),
+    ], axis=1).reshape(-1, 3, 3)
+
+def local_matrices(skel : D3DSkeleton) -> np.ndarray:
+    """(N,4,4) local rest matrices, column vectors (rotate, then translate)"""
+    local = np.zeros((skel.bone_count, 4, 4), dtype=np.float64)
+    local[:, :3, :3] = quat_matrices(skel.rotations)
+    local[:, :3, 3] = skel.positions
+    local[:, 3, 3] = 1
+    return local
+
+def bone_depths(parents : np.ndarray) -> np.ndarray:
+    """
+    Distance of every bone from its root
+
+    Parent cycles are broken by making one of their bones a root
+    (parents is changed in place)
+    """
+    depths = np.zeros(len(parents), dtype=np.int32)
+    ancestors = parents.copy()
+    for _ in range(len(parents)):
+        linked = ancestors >= 0
+        if not linked.any():
+            return depths
+        depths[linked] += 1
+        ancestors[linked] = parents[ancestors[linked]]
+    # Still linked after N steps: those chains end up going around a cycle, at one of its bones
+    cut = np.unique(ancestors[ancestors >= 0])
+    log.warning("Parent cycle through bones %s, made them roots", cut.tolist())
+    parents[cut] = -1
+    return bone_depths(parents)
+
+def world_matrices(skel : D3DSkeleton) -> np.ndarray:
+    """(N,4,4) world rest matrices: parent's world @ local, one batched matmul per hierarchy level"""
+    local = local_matrices(skel)
+    world = local.copy()
+    depths = bone_depths(skel.parents)
+    order = np.argsort(depths, kind='stable')
+    level_starts = np.searchsorted(depths[order], np.arange(1, depths.max(initial=0) + 1))
+    for level in np.split(order, level_starts)[1:]:
+        world[level] = world[skel.parents[level]] @ local[level]
+    return world
+
+def bone_lengths(skel : D3DSkeleton, world : np.ndarray) -> np.ndarray:
+    """
+    Display length of every bone: the distance to its farthest child,
+    half the typical length for leaves (and bones sitting on their children)
+    """
+    heads = world[:, :3, 3]
+    lengths = np.zeros(skel.bone_count, dtype=np.float64)
+    child = np.flatnonzero(skel.parents >= 0)
+    np.maximum.at(lengths, skel.parents[child], np.linalg.norm(heads[child] - heads[skel.parents[child]], axis=1))
+    short = lengths <= 1e-4
+    lengths[short] = np.median(lengths[~short]) * 0.5 if not short.all() else 0.1
+    return lengths
@@ -0,0 +1,336 @@
+"""
+Synthetic version 55 .d3dmesh writer
+
+write_d3dmesh lays a file out section by section the way parse_d3dmesh
+reads it (header, materials, LOD tables, material groups, clamps, buffer
+info, index buffer, vertex streams) with made-up geometry, so the parser
+can be measured (see bench.py) and exercised without game files.
+Everything is deterministic for a given seed
+
+    python -m <addon_package>.synth <out.d3dmesh> --verts 50000 --tris 80000 --lods 3 --submeshes 4 --position-format 27 --uv 25 25
+"""
+
+import argparse
+import io
+import struct
+import sys
+import numpy as np
+
+# Formats the writer can fill in, per stream (see decode_stream)
+POSITION_FORMATS = (4, 27, 42)
+UV_FORMATS = (3, 24, 25)
+NORMAL_FORMATS = (26, 38)
+WEIGHT_FORMATS = (27, 42)
+COLOR_FORMATS = (33, 39)
+
+# (VertType, VertLayer) of every stream in Section 12, the inverse of d3dmesh.stream_names
+_stream_ids = {
+    "Vertex": (1, 1), "Normals": (2, 1), "Weights": (4, 1), "Bones": (5, 1), "Colors": (6, 1),
+    "UV1": (7, 1), "UV2": (7, 2), "UV3": (7, 3), "UV4": (7, 4), "UV5": (7, 5), "UV6": (7, 6),
+}
+
+# Bytes per vertex of the VertFlags 0x31 interleaved buffer: position, 4 bone indices, 4 weights
+_interleaved_stride = 24
+
+# Material parameter blocks written for every material: (hash1, hash2) of the layout, see d3dmesh._mat_param_layouts
+_float_param = (0xbae4cbd7, 0x7f139a91)
+_texture_param = (0x52a09151, 0xf1c3f2c7)
+_diffuse_type = (0x8648fa82, 0xd1dbee1a)
+
+class _Writer:
+    """Little-endian writes plus patching of Telltale's "offset from here" lengths"""
+
+    def __init__(self):
+        self.b = io.BytesIO()
+
+    def tell(self) -> int:
+        return self.b.tell()
+
+    def longs(self, *values):
+        self.b.write(struct.pack(f'<{len(values)}I', *values))
+
+    def floats(self, *values):
+        self.b.write(struct.pack(f'<{len(values)}f', *values))
+
+    def bytes(self, data):
+        self.b.write(data)
+
+    def length_field(self) -> int:
+        """Placeholder for a length counted from the field itself, returns where it is"""
+        field = self.tell()
+        self.longs(0)
+        return field
+
+    def end_length(self, field : int, end : int = None):
+        """Fill in a length_field with end (default: the current position) - field"""
+        end = self.tell() if end is None else end
+        here = self.tell()
+        self.b.seek(field)
+        self.longs(end - field)
+        self.b.seek(here)
+
+def _lod_shares(total : int, lod_count : int, submesh_count : int) -> list[list[int]]:
+    """Split total over LODs (each half the previous one) and evenly over their submeshes, at least 1 each"""
+    weights = 0.5 ** np.arange(lod_count)
+    per_lod = np.floor(total * weights / weights.sum()).astype(int)
+    per_lod[0] += total - per_lod.sum()
+    shares = []
+    for count in np.maximum(per_lod, submesh_count).tolist():
+        share = [count // submesh_count] * submesh_count
+        share[0] += count % submesh_count
+        shares.append(share)
+    return shares
+
+def _submesh_indices(rng, vert_count : int, tri_count : int) -> np.ndarray:
+    """Random triangles over vert_count vertices, every vertex used if there are enough face points"""
+    indices = rng.integers(0, vert_count, size=tri_count * 3)
+    covered = min(vert_count, tri_count * 3)
+    indices[:covered] = rng.permutation(vert_count)[:covered]
+    return indices
+
+def _stream_bytes(rng, stream : str, fmt : int, count : int, bone_count : int) -> bytes:
+    """count vertices of a stream, as random values in the format's range"""
+    match stream, fmt:
+        case "Vertex", 4:
+            return rng.uniform(-1, 1, size=(count, 3)).astype('<f4').tobytes()
+        case "UV1" | "UV2" | "UV3" | "UV4" | "UV5" | "UV6", 3:
+            return rng.uniform(0, 1, size=(count, 2)).astype('<f4').tobytes()
+        case "UV1" | "UV2" | "UV3" | "UV4" | "UV5" | "UV6", 24:
+            return rng.integers(-32767, 32768, size=(count, 2)).astype('<i2').tobytes()
+        case "Bones", 33:
+            return rng.integers(0, max(bone_count, 1), size=(count, 4)).astype('u1').tobytes()
+        case "Weights", 27:
+            # Sorted so the first influence is the largest, like exported skins
+            return np.sort(rng.integers(0, 65536, size=(count, 4)), axis=1)[:, ::-1].astype('<u2').tobytes()
+        case "Normals", 26:
+            return rng.integers(-32767, 32768, size=(count, 4)).astype('<i2').tobytes()
+        case "Normals", 38:
+            return rng.integers(-127, 128, size=(count, 4)).astype('i1').tobytes()
+        case _, 27:
+            return rng.integers(0, 65536, size=(count, 4)).astype('<u2').tobytes()
+        case _, 25:
+            return rng.integers(0, 65536, size=(count, 2)).astype('<u2').tobytes()
+        case _, 33 | 39 | 42:
+            return rng.integers(0, 1 << 32, size=count, dtype=np.uint64).astype('<u4').tobytes()
+    raise ValueError(f"Can't write {stream} format {fmt}")
+
+def write_d3dmesh(path,
+                  vert_count = 1000,
+                  tri_count = 1500,
+                  lod_count = 1,
+                  submesh_count = 1,
+                  position_format = 42,
+                  uv_formats = (25,),
+                  normal_format : int = None,
+                  weight_format : int = None,
+                  bone_count = 0,
+                  color_format : int = None,
+                  material_count = 2,
+                  orient = "X",
+                  seed = 0,
+                  name = "synthetic_mesh",
+                  interleaved = False,
+                  ) -> dict:
+    """
+    Write a version 55 .d3dmesh (path may also be a writable binary file object)
+
+    vert_count and tri_count are file totals, split over the LODs (each
+    half the size of the previous one) and evenly over each LOD's
+    submeshes, every submesh using its own vertex range. uv_formats has
+    one format per UV layer (up to 6). normal_format, weight_format and
+    color_format add those streams, bone_count > 0 adds a bone index
+    stream and a bone palette of that size to every LOD. interleaved
+    writes a VertFlags 0x31 mesh instead, its bone indices in the
+    interleaved buffer rather than a stream.
+    Returns what was written: actual vertex/triangle counts, index size,
+    file size
+    """
+    if position_format not in POSITION_FORMATS:
+        raise ValueError(f"Position format {position_format} not one of {POSITION_FORMATS}")
+    if len(uv_formats) > 6 or any(fmt not in UV_FORMATS for fmt in uv_formats):
+        raise ValueError(f"Up to 6 UV layers with formats from {UV_FORMATS}")
+    if normal_format is not None and normal_format not in NORMAL_FORMATS:
+        raise ValueError(f"Normals format {normal_format} not one of {NORMAL_FORMATS}")
+    if weight_format is not None and weight_format not in WEIGHT_FORMATS:
+        raise ValueError(f"Weights format {weight_format} not one of {WEIGHT_FORMATS}")
+    if color_format is not None and color_format not in COLOR_FORMATS:
+        raise ValueError(f"Colors format {color_format} not one of {COLOR_FORMATS}")
+    rng = np.random.default_rng(seed)
+    lod_verts = _lod_shares(vert_count, lod_count, submesh_count)
+    lod_tris = _lod_shares(tri_count, lod_count, submesh_count)
+    total_verts = sum(map(sum, lod_verts))
+    total_tris = sum(map(sum, lod_tris))
+    index_size = 2 if max(map(max, lod_verts)) <= 0x10000 else 4
+    material_count = max(material_count, 1)
+    w = _Writer()
+
+    # Header
+    name = name.encode('ascii')
+    w.bytes(b"6VSM")
+    file_size = w.length_field()
+    w.bytes(bytes(8))
+    w.longs(0)                              # ParamCount
+    w.longs(len(name) + 8, len(name))
+    w.bytes(name)
+    w.bytes(bytes([55]))
+    # Section 1 (Model Info), skipped by the parser
+    w.bytes(bytes(0x14))
+
+    # Section 2 (Material Info)
+    w.longs(material_count)
+    for m in range(material_count):
+        w.longs(0x1000 + m, 0x2000 + m, 0, 0)  # MatHash2, MatHash1, UnkHash2, UnkHash1
+        header_end = w.length_field()
+        w.longs(0, 0, 0, 0)                 # MatUnk1, MatUnk2, MatHeaderSizeB, MatUnk3Count
+        w.longs(2)                          # MatParamCount
+        w.longs(_float_param[1], _float_param[0], 2)
+        for p in range(2):
+            w.longs(0x3000 + p, 0x4000 + p)
+            w.floats(0.5)
+        w.longs(_texture_param[1], _texture_param[0], 1)
+        w.longs(_diffuse_type[1], _diffuse_type[0], 0xaaaa0000 + m, 0xbbbb0000 + m)
+        w.end_length(header_end)
+    w.longs(0)
+    w.bytes(bytes(1))
+    face_data_start = w.length_field()
+
+    # Section 3 (LOD info), submesh ranges and triangle slices in buffer order
+    sect3 = w.length_field()
+    w.longs(lod_count)
+    vert_start = 0
+    poly_start = 0
+    submesh_ranges = []                     # (vertex start, vertex count, triangle count)
+    for lod in range(lod_count):
+        sect3a = w.length_field()
+        w.longs(submesh_count)
+        for sm, (sm_verts, sm_tris) in enumerate(zip(lod_verts[lod], lod_tris[lod])):
+            w.floats(-1, -1, -1, 1, 1, 1)
+            w.longs(0, 0)                   # HeaderLength, unknown1
+            w.floats(0, 0, 0)
+            w.longs(0)                      # unknown2
+            w.longs(0, sm_verts - 1, vert_start, poly_start * 3, sm_tris, sm_tris * 3)
+            w.longs(8, 0, sm % material_count, 0)   # HeaderLength2, unknown3, MatNum, unknown4
+            submesh_ranges.append((vert_start, sm_verts, sm_tris))
+            vert_start += sm_verts
+            poly_start += sm_tris
+        w.end_length(sect3a)
+        sect3b = w.length_field()
+        w.longs(0)
+        w.end_length(sect3b)
+        # Section 3C
+        w.longs(0, 0)
+        w.floats(-1, -1, -1, 1, 1, 1)
+        w.longs(4)
+        w.floats(0, 0, 0, 0)
+        w.longs(*([0] * 10))
+        # Section 3D (bone palette)
+        w.longs(4, bone_count)
+        for bone in range(bone_count):
+            w.longs(0x100 + bone, 0x200 + bone)
+    w.end_length(sect3)
+
+    # Section 4
+    sect = w.length_field(); w.longs(0); w.end_length(sect)
+    # Section 5 (Material Groups), one per material in order
+    sect = w.length_field()
+    w.longs(material_count)
+    for m in range(material_count):
+        w.longs(76, 0x1000 + m, 0x2000 + m, 0, 0)
+        w.floats(*([0.0] * 8))
+        w.longs(0)
+        w.floats(0, 0, 0, 0)
+        w.longs(0)
+    w.end_length(sect)
+    # Section 6
+    sect = w.length_field(); w.longs(1); w.longs(16, 1, 2, 3); w.end_length(sect)
+    # Sections 7, 8, 9
+    for s in range(3):
+        sect = w.length_field(); w.longs(0); w.end_length(sect)
+
+    # Section 10 (Model Clamps)
+    w.longs(0)
+    w.bytes(bytes(4))
+    w.floats(-1.5, -2.0, 0.25, 1.5, 3.0, 4.75)
+    w.longs(0)
+    w.floats(0, 0, 0, 0)
+    w.longs(0)
+    w.floats(0, 0, 0, *{"X": (1, 0, 0), "Y": (0, 1, 0), "Z": (0, 0, 1)}.get(orient, (0, 0, 0)), 0, 0, 0)
+    w.longs(0, 0, 0)
+
+    # Section 11 (vertex count, flags, UV clamps)
+    w.longs(total_verts, 0x31 if interleaved else 0x01)
+    sect = w.length_field(); w.longs(0); w.end_length(sect)
+    w.longs(len(uv_formats))
+    for layer in range(len(uv_formats)):
+        w.longs(layer)
+        w.floats(2.0, 3.0, -0.5, 0.25)
+    if interleaved:
+        # Section 11C, the interleaved buffer sits between its header and Section 12
+        w.longs(*([0] * 9))
+        sect = w.length_field()
+        w.longs(total_verts * _interleaved_stride)
+        records = np.zeros(total_verts, dtype=[('pos', '<f4', 3), ('bones', 'u1', 4), ('weights', '<u2', 4)])
+        records['pos'] = rng.uniform(-1, 1, size=(total_verts, 3))
+        records['bones'] = rng.integers(0, max(bone_count, 1), size=(total_verts, 4))
+        records['weights'] = rng.integers(0, 65536, size=(total_verts, 4))
+        w.bytes(records.tobytes())
+        w.end_length(sect)
+
+    # Section 12 (Vertex/Face Buffer Info), streams in the order they follow each other
+    streams = [("Vertex", position_format)]
+    if weight_format is not None: streams.append(("Weights", weight_format))
+    if bone_count and not interleaved: streams.append(("Bones", 33))
+    if normal_format is not None: streams.append(("Normals", normal_format))
+    streams += [(f"UV{layer+1}", fmt) for layer, fmt in enumerate(uv_formats) if layer >= 4]
+    if color_format is not None: streams.append(("Colors", color_format))
+    streams += [(f"UV{layer+1}", fmt) for layer, fmt in enumerate(uv_formats) if layer < 4]
+    w.longs(0, 0, 1, len(streams), 0)
+    for i, (stream, fmt) in enumerate(streams):
+        vert_type, vert_layer = _stream_ids[stream]
+        w.longs(vert_type - 1, fmt - 1, vert_layer - 1, i, 0)
+    w.longs(0, 0, 0, total_tris * 3, index_size)
+    w.longs(0, 0, 0, 0, 0)
+    w.end_length(face_data_start)
+
+    # Index buffer, each submesh's triangles relative to its vertex start
+    index_dtype = '<u2' if index_size == 2 else '<u4'
+    for sm_start, sm_verts, sm_tris in submesh_ranges:
+        w.bytes(_submesh_indices(rng, sm_verts, sm_tris).astype(index_dtype).tobytes())
+    for stream, fmt in streams:
+        w.bytes(_stream_bytes(rng, stream, fmt, total_verts, bone_count))
+
+    size = w.tell()
+    w.end_length(file_size, size + file_size)
+    data = w.b.getvalue()
+    if hasattr(path, "write"):
+        path.write(data)
+    else:
+        with open(path, "wb") as f:
+            f.write(data)
+    return {"vert_count": total_verts, "tri_count": total_tris, "index_size": index_size, "file_size": size}
+
+def main(argv = None) -> int:
+    parser = argparse.ArgumentParser(prog="synth", description="Write a synthetic version 55 .d3dmesh")
+    parser.add_argument("path", help="File to write")
+    parser.add_argument("--verts", type=int, default=1000, help="Vertices in the file (default 1000)")
+    parser.add_argument("--tris", type=int, default=1500, help="Triangles in the file (default 1500)")
+    parser.add_argument("--lods", type=int, default=1, help="LOD count (default 1)")
+    parser.add_argument("--submeshes", type=int, default=1, help="Submeshes per LOD (default 1)")
+    parser.add_argument("--position-format", type=int, choices=POSITION_FORMATS, default=42)
+    parser.add_argument("--uv", type=int, nargs="*", choices=UV_FORMATS, default=[25], help="Format of every UV layer (default one layer, 25)")
+    parser.add_argument("--normals", type=int, choices=NORMAL_FORMATS)
+    parser.add_argument("--weights", type=int, choices=WEIGHT_FORMATS)
+    parser.add_argument("--bones", type=int, default=0, help="Bone palette size, adds a bone index stream")
+    parser.add_argument("--colors", type=int, choices=COLOR_FORMATS)
+    parser.add_argument("--interleaved", action="store_true", help="Write a VertFlags 0x31 mesh, bone indices in the interleaved buffer")
+    parser.add_argument("--orient", choices=("X", "Y", "Z", "Q"), default="X", help="Axis format 42 positions get extra precision on")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    info = write_d3dmesh(args.path, args.verts, args.tris, args.lods, args.submeshes, args.position_format, tuple(args.uv),
+                         args.normals, args.weights, args.bones, args.colors, orient=args.orient, seed=args.seed,
+                         interleaved=args.interleaved)
+    print(f"Wrote {args.path}: {info['vert_count']} verts, {info['tri_count']} tris, {info['file_size']} bytes")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
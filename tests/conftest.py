@@ -0,0 +1,15 @@
+import importlib
+import os
+import sys
+import pytest
+
+# The add-on folder is the package (its modules use relative imports), so
+# import it by folder name from its parent. Only the bpy-free modules work here
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = os.path.basename(ROOT)
+sys.path.insert(0, os.path.dirname(ROOT))
+
+@pytest.fixture(scope="session")
+def addon():
+    """Module of the add-on by name: addon("d3dmesh")"""
+    return lambda name: importlib.import_module(f"{PACKAGE}.{name}")
@@ -0,0 +1,34 @@
+import os
+import signal
+import struct
+import time
+import pytest
+
+def _write_bad_files(folder):
+    (folder / "garbage.d3dmesh").write_bytes(b'garbage' * 3)
+    # Right magic, ParamCount far past the end of the file
+    (folder / "counts.d3dmesh").write_bytes(b"6VSM" + struct.pack('<I', 100) + bytes(8) + struct.pack('<I', 0x61676567) + bytes(40))
+    (folder / "truncated.d3dmesh").write_bytes(b"6VSM" + bytes(10))
+
+def test_bad_files_fail_cleanly(addon, tmp_path):
+    _write_bad_files(tmp_path)
+    addon("synth").write_d3dmesh(str(tmp_path / "good.d3dmesh"))
+    failures = addon("batch").run([str(tmp_path)], jobs=2)
+    assert sorted(os.path.basename(result["path"]) for result in failures) == ["counts.d3dmesh", "garbage.d3dmesh", "truncated.d3dmesh"]
+    assert all(result["error"] for result in failures)
+
+@pytest.mark.skipif(not hasattr(signal, "SIGALRM"), reason="time_limit needs SIGALRM")
+def test_time_limit(addon):
+    with pytest.raises(TimeoutError):
+        with addon("batch").time_limit(0.2):
+            time.sleep(5)
+
+def test_parse_all_yields_every_file_once(addon, tmp_path):
+    synth = addon("synth")
+    paths = [str(tmp_path / f"mesh{i}.d3dmesh") for i in range(9)]
+    for i, path in enumerate(paths):
+        synth.write_d3dmesh(path, vert_count=100, tri_count=150, seed=i)
+    # More files than the 2 per worker in flight
+    results = list(addon("batch").parse_all(paths, {}, jobs=2))
+    assert sorted(result["path"] for result in results) == sorted(paths)
+    assert all(result["ok"] for result in results)
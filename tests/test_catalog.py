@@ -0,0 +1,25 @@
+import os
+
+def test_garbage_file_listed_as_failed(addon, tmp_path, capsys):
+    catalog = addon("catalog")
+    folder = tmp_path / "game"
+    folder.mkdir()
+    synth = addon("synth")
+    for i in range(3):
+        synth.write_d3dmesh(str(folder / f"mesh{i}.d3dmesh"), seed=i)
+    (folder / "garbage.d3dmesh").write_bytes(b'garbage' * 3)
+    db = str(tmp_path / "meshes.sqlite")
+
+    assert catalog.main(["index", str(folder), "--db", db, "-j", "2"]) == 0
+    assert "4 files, 4 probed" in capsys.readouterr().out
+    assert catalog.main(["find", "--db", db, "--failed"]) == 0
+    out = capsys.readouterr().out.splitlines()
+    assert out[-1] == "1 matches"
+    assert out[0].startswith(os.path.abspath(folder / "garbage.d3dmesh") + ": ValueError")
+    with catalog.MeshCatalog(db) as index:
+        assert len(index.find()) == 3
+
+def test_vanished_file_is_a_failed_row(addon, tmp_path):
+    row = addon("catalog")._probe_file(str(tmp_path / "gone.d3dmesh"))
+    assert row["error"].startswith("FileNotFoundError")
+    assert row["size"] is None and row["mtime_ns"] is None
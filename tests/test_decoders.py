@@ -0,0 +1,86 @@
+import io
+import struct
+import numpy as np
+import pytest
+
+def reader(addon, fmt, *values):
+    return addon("wbr").WBR(io.BytesIO(struct.pack(fmt, *values)))
+
+def test_positions_float(addon):
+    f = reader(addon, '<6f', 1, 2, 3, -4, 5.5, 6)
+    xyz = addon("d3dmesh").decode_positions(f, 4, 2, (100, 100, 100), (2, 2, 2))
+    # Float positions are stored as is, the bounds don't apply
+    np.testing.assert_array_equal(xyz, [[1, 2, 3], [-4, 5.5, 6]])
+
+def test_positions_unorm16(addon):
+    f = reader(addon, '<4H', 0, 65535, 32768, 7)
+    xyz = addon("d3dmesh").decode_positions(f, 27, 1, (1, 2, 3), (10, 20, 30))
+    np.testing.assert_array_equal(xyz, np.float32([[1, 2 + 20, 3 + 30 * 32768 / 65535]]))
+
+@pytest.mark.parametrize("orient", ["Q", "X", "Y", "Z"])
+def test_positions_packed_quarter_bits(addon, orient):
+    # x = 1023, y = 0, z = 512, quarter 2
+    packed = 1023 | (0 << 10) | (512 << 20) | (2 << 30)
+    f = reader(addon, '<I', packed)
+    xyz = addon("d3dmesh").decode_positions(f, 42, 1, (0, 0, 0), (1, 1, 1), orient)
+    expected = [1, 0, 512 / 1023]
+    if orient != "Q":
+        # The orientation axis only covers a quarter of the range, the top 2 bits pick which
+        axis = "XYZ".index(orient)
+        expected[axis] = expected[axis] / 4 + 2 / 4
+    np.testing.assert_array_equal(xyz, np.float32([expected]))
+
+@pytest.mark.parametrize("fmt, pack, values, uv", [
+    (3, '<2f', (0.25, 0.75), (0.25, 0.25)),
+    (24, '<2h', (32767, -32767), (1 * 2 + 1, 1 - (-1 * 4 - 1))),
+    (25, '<2H', (0, 65535), (1, 1 - (4 - 1))),
+])
+def test_uvs_flip_v(addon, fmt, pack, values, uv):
+    f = reader(addon, pack, *values)
+    # Float UVs ignore the layer's mult/start, the others are scaled then V flipped
+    got = addon("d3dmesh").decode_uvs(f, fmt, 1, (2, 4), (1, -1))
+    np.testing.assert_allclose(got, [uv], rtol=1e-6)
+
+def test_weights_unorm16(addon):
+    f = reader(addon, '<4H', 65535, 0, 32768, 0)
+    got = addon("d3dmesh").decode_weights(f, 27, 1)
+    np.testing.assert_array_equal(got, np.float32([[1, 0, 32768 / 65535, 0]]))
+
+def test_weights_packed(addon):
+    # weight 2 = 1023 plus one 1/8 step, weight 3 = 0, weight 4 = 1023
+    packed = 1023 | (0 << 10) | (1023 << 20) | (1 << 30)
+    f = reader(addon, '<I', packed)
+    got = addon("d3dmesh").decode_weights(f, 42, 1)
+    w2, w3, w4 = 1 / 8 + 1 / 8, 0, 1 / 4
+    np.testing.assert_allclose(got, [[1 - w2 - w3 - w4, w2, w3, w4]], rtol=1e-6)
+
+def test_bones_and_colors_are_raw_bytes(addon):
+    d3dmesh = addon("d3dmesh")
+    raw = bytes([0, 1, 254, 255, 9, 8, 7, 6])
+    for decode, fmt in ((d3dmesh.decode_bones, 33), (d3dmesh.decode_colors, 33), (d3dmesh.decode_colors, 39)):
+        got = decode(addon("wbr").WBR(io.BytesIO(raw)), fmt, 2)
+        assert got.dtype == np.uint8
+        np.testing.assert_array_equal(got, np.frombuffer(raw, 'u1').reshape(2, 4))
+
+@pytest.mark.parametrize("fmt, pack, scale", [(38, '<4b', 127), (26, '<4h', 32767)])
+def test_snorm4(addon, fmt, pack, scale):
+    f = reader(addon, pack, scale, -scale, 0, scale // 2)
+    got = addon("d3dmesh").decode_snorm4(f, fmt, 1)
+    np.testing.assert_array_equal(got, np.float32([[1, -1, 0, (scale // 2) / np.float32(scale)]]))
+
+@pytest.mark.parametrize("decode, fmt", [("decode_positions", 5), ("decode_uvs", 4), ("decode_weights", 33),
+                                         ("decode_bones", 27), ("decode_snorm4", 33), ("decode_colors", 38)])
+def test_unknown_formats_raise(addon, decode, fmt):
+    f = reader(addon, '<16I', *range(16))
+    args = {"decode_positions": ((0, 0, 0), (1, 1, 1)), "decode_uvs": ((1, 1), (0, 0))}.get(decode, ())
+    with pytest.raises(ValueError):
+        getattr(addon("d3dmesh"), decode)(f, fmt, 1, *args)
+
+def test_seek_rejects_bad_whence_and_offsets(addon):
+    f = reader(addon, '<4I', 1, 2, 3, 4)
+    assert f.seek(-4, 2) == 12
+    assert f.readLong() == 4
+    for args in ((17,), (-1,), (1, 1), (0, 3)):
+        with pytest.raises(ValueError):
+            f.seek(*args)
+    assert f.tell() == 16
@@ -0,0 +1,11 @@
+import pytest
+
+@pytest.mark.parametrize("verbose", [False, True])
+def test_resolver_prints_only_when_verbose(addon, capsys, verbose):
+    hashdb = addon("hashdb")
+    hashdb._indexes.pop("NoSuchNames", None)
+    resolver = hashdb.NameResolver("NoSuchNames", verbose=verbose)
+    key = resolver.request(0x1234, 0x5678)
+    resolver.resolve()
+    assert resolver.name(key) == "12345678"
+    assert ("NoSuchNames.HashDB not found" in capsys.readouterr().out) == verbose
@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+
+@pytest.mark.parametrize("interleaved", [False, True])
+def test_load_lod_matches_full_parse(addon, tmp_path, interleaved):
+    d3dmesh = addon("d3dmesh")
+    path = str(tmp_path / "skinned.d3dmesh")
+    addon("synth").write_d3dmesh(path, vert_count=3000, tri_count=5000, lod_count=3, submesh_count=2,
+                                 weight_format=27, bone_count=40, normal_format=38, interleaved=interleaved)
+    mesh = d3dmesh.parse_d3dmesh(path)
+    assert mesh.bones is not None and mesh.weights is not None
+    tables, _ = d3dmesh.mesh_tables(mesh)
+    for lodnum in range(len(mesh.lods)):
+        lod_mesh = d3dmesh.load_lod(path, tables, lodnum)
+        full_parts = d3dmesh.mesh_parts(mesh, join_submeshes=False, lods=[lodnum])
+        lod_parts = d3dmesh.mesh_parts(lod_mesh, join_submeshes=False, lods=[lodnum])
+        assert len(full_parts) == len(lod_parts) == 2
+        for full, part in zip(full_parts, lod_parts):
+            np.testing.assert_array_equal(part.faces, full.faces)
+            for attr in ("positions", "bones", "weights", "normals"):
+                np.testing.assert_array_equal(getattr(lod_mesh, attr)[part.vert_ids], getattr(mesh, attr)[full.vert_ids],
+                                              err_msg=f"LOD {lodnum} {attr}")
+            assert d3dmesh.skin_groups(lod_mesh, part) == d3dmesh.skin_groups(mesh, full)
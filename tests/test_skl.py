@@ -0,0 +1,9 @@
+import struct
+import pytest
+
+@pytest.mark.parametrize("bone_count", [0x7fffffff, 3])
+def test_bone_count_past_the_end_fails_cleanly(addon, tmp_path, bone_count):
+    path = tmp_path / "bad.skl"
+    path.write_bytes(b"6VSM" + struct.pack('<I', 100) + bytes(8) + struct.pack('<I', 0) + struct.pack('<II', 0, bone_count) + bytes(64))
+    with pytest.raises(ValueError, match="BoneCount"):
+        addon("skl").parse_skl(str(path))
@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Texture lookup and loading for parse_textures
+#
+# TextureIndex maps texture names to files under a user-given root folder.
+# The walk happens once, the result is saved in INDEX_DIR and reused by
+# later sessions until it's rebuilt from the preferences.
+#
+# TextureLoader loads every texture once per Blender session, keyed by its
+# hash. While meshes are still being parsed, the files their materials
+# will need are read in a thread pool, so by the time the (main thread
+# only) bpy.data.images.load runs they come from the OS file cache
+
+TEXTURE_EXTS = (".dds", ".png", ".tga")
+INDEX_DIR = os.path.join(os.path.dirname(__file__), "TextureIndexes")
+INDEX_VERSION = 1
+
+def index_path(root : str) -> str:
+    return os.path.join(INDEX_DIR, hashlib.sha1(os.path.abspath(root).encode('utf-8')).hexdigest() + ".json")
+
+class TextureIndex:
+    """{lowercase texture name: path} for every texture file under root"""
+
+    def __init__(self, root : str, paths : dict = None):
+        self.root = os.path.abspath(root)
+        self.paths = paths or {}
+        self.build_ms = 0.0
+
+    @classmethod
+    def build(cls, root : str) -> "TextureIndex":
+        start = time.perf_counter()
+        index = cls(root)
+        # Earlier extensions win when a name exists in several formats
+        rank = {ext: i for i, ext in enumerate(TEXTURE_EXTS)}
+        best = {}
+        for folder, dirs, files in os.walk(index.root):
+            for file_name in files:
+                name, ext = os.path.splitext(file_name)
+                ext = ext.lower()
+                if ext not in rank:
+                    continue
+                key = name.lower()
+                if key not in best or rank[ext] < best[key][0]:
+                    best[key] = (rank[ext], os.path.join(folder, file_name))
+        index.paths = {key: path for key, (_, path) in best.items()}
+        index.build_ms = (time.perf_counter() - start) * 1000
+        return index
+
+    def save(self, path : str = None) -> None:
+        path = path or index_path(self.root)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding='utf-8') as f:
+            json.dump({"version": INDEX_VERSION, "root": self.root, "paths": self.paths}, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, root : str, rebuild = False, verbose = False) -> "TextureIndex":
+        """Saved index of root, walked (and saved) if there is none yet or rebuild is set"""
+        path = index_path(root)
+        if not rebuild and os.path.isfile(path):
+            start = time.perf_counter()
+            try:
+                with open(path, "r", encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get("version") == INDEX_VERSION:
+                    index = cls(data["root"], data["paths"])
+                    index.build_ms = (time.perf_counter() - start) * 1000
+                    if verbose: print(f"Loaded texture index of {root} ({len(index)} textures) in {index.build_ms:.1f} ms")
+                    return index
+            except (OSError, ValueError, KeyError):
+                pass
+        index = cls.build(root)
+        index.save(path)
+        if verbose: print(f"Indexed {len(index)} textures under {root} in {index.build_ms:.1f} ms")
+        return index
+
+    def get(self, name : str) -> str:
+        return self.paths.get(name.lower())
+
+    def __len__(self):
+        return len(self.paths)
+
+def _read_file(path : str) -> int:
+    """Pull a file into the OS cache, returns its size"""
+    size = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            size += len(chunk)
+    return size
+
+class TextureLoader:
+    """Session-wide texture hash -> Blender image, with file prefetching"""
+
+    def __init__(self, index : TextureIndex = None, workers : int = 4):
+        self.index = index
+        self._images = {}   # (hash1, hash2) -> image name
+        self._pending = {}  # path -> prefetch future
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="d3dmesh_tex")
+        self.hits = 0
+        self.loads = 0
+        self.misses = 0
+        self.prefetched_bytes = 0
+        self.wait_ms = 0.0
+        self.load_ms = 0.0
+
+    def find(self, name : str, search_dirs = ()) -> str:
+        """Path of a texture: the index first, then the given folders"""
+        if self.index is not None:
+            path = self.index.get(name)
+            if path is not None and os.path.isfile(path):
+                return path
+        for folder in search_dirs:
+            for ext in TEXTURE_EXTS:
+                path = os.path.join(folder, name + ext)
+                if os.path.isfile(path):
+                    return path
+        return None
+
+    def prefetch(self, mesh, search_dirs = ()) -> int:
+        """Start reading every texture a parsed mesh's materials use, returns how many were queued"""
+        queued = 0
+        for mat in mesh.materials:
+            for (tex_type, tex_subtype, tex_key), tex_name in zip(mat.textures, mat.texture_names):
+                if tex_key in self._images:
+                    continue
+                path = self.find(tex_name, search_dirs)
+                if path is None or path in self._pending:
+                    continue
+                self._pending[path] = self._pool.submit(_read_file, path)
+                queued += 1
+        return queued
+
+    def image(self, tex_key : tuple, tex_name : str, search_dirs = ()):
+        """Blender image for a texture, loaded on first use, None if no file is found"""
+        import bpy
+        name = self._images.get(tex_key)
+        if name is not None:
+            img = bpy.data.images.get(name)
+            if img is not None:
+                self.hits += 1
+                return img
+        path = self.find(tex_name, search_dirs)
+        if path is None:
+            self.misses += 1
+            return None
+        future = self._pending.pop(path, None)
+        if future is not None:
+            start = time.perf_counter()
+            try:
+                self.prefetched_bytes += future.result()
+            except OSError:
+                pass
+            self.wait_ms += (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        img = bpy.data.images.load(path, check_existing=True)
+        self.load_ms += (time.perf_counter() - start) * 1000
+        self.loads += 1
+        self._images[tex_key] = img.name
+        return img
+
+    def summary(self) -> str:
+        index = f"index {len(self.index)} textures ({self.index.build_ms:.1f} ms), " if self.index is not None else ""
+        return (f"{index}{self.loads} loaded in {self.load_ms:.1f} ms "
+                f"({self.prefetched_bytes / (1 << 20):.1f} MB prefetched, {self.wait_ms:.1f} ms waiting), "
+                f"{self.hits} reused, {self.misses} not found")
+
+# One loader per session (per texture root), so images are shared between imports
+_loader = None
+
+def get_loader(root : str = None, rebuild = False, verbose = False) -> TextureLoader:
+    """The session's loader, replaced when root changes ("" = no index, None = keep the current one)"""
+    global _loader
+    if root is None and _loader is not None and not rebuild:
+        return _loader
+    root = os.path.abspath(root) if root else None
+    current_root = _loader.index.root if _loader is not None and _loader.index is not None else None
+    if _loader is None or rebuild or root != current_root:
+        index = TextureIndex.load(root, rebuild=rebuild, verbose=verbose) if root and os.path.isdir(root) else None
+        _loader = TextureLoader(index)
+    return _loader
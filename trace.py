@@ -0,0 +1,107 @@
+import json
+import logging
+import time
+
+# Parser tracing
+#
+# Messages go through logging at three levels: SECTION (file layout),
+# RECORD (one line per material, LOD, submesh...) and ELEMENT (every
+# parameter, buffer entry...). Arguments are formatted by logging only if
+# the message is actually emitted, so a non-verbose parse doesn't pay for
+# building any of them.
+#
+# Optionally every section (name, offset, length, time spent) is also
+# written to a JSON lines file, with a last line saying whether the parse
+# finished or where it failed, and/or timed into an ImportProfile
+# (profiling.py)
+
+SECTION = logging.INFO
+RECORD = 15
+ELEMENT = logging.DEBUG
+logging.addLevelName(RECORD, "RECORD")
+
+class _PrintHandler(logging.Handler):
+    """Prints to whatever sys.stdout currently is, like the plain prints this replaces"""
+
+    def emit(self, record):
+        try:
+            print(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+_handler = _PrintHandler()
+_handler.setFormatter(logging.Formatter("%(message)s"))
+
+def console_logging(logger : logging.Logger, verbose) -> None:
+    """
+    Show logger's messages in the console, all of them when verbose,
+    warnings only otherwise. verbose=None leaves the logging setup alone
+    """
+    if verbose is None:
+        return
+    if _handler not in logger.handlers:
+        logger.addHandler(_handler)
+    logger.setLevel(ELEMENT if verbose else logging.WARNING)
+
+class Tracer:
+    """Leveled messages for one parse, plus the optional JSON lines section trace and profile"""
+
+    def __init__(self, logger : logging.Logger, filepath : str, trace_path : str = None, profile = None):
+        self.log = logger
+        self.filepath = filepath
+        # Line buffered, so parallel parses appending to the same file don't mix up lines
+        self.trace = open(trace_path, "a", encoding='utf-8', buffering=1) if trace_path else None
+        self.profile = profile
+        self.start = time.perf_counter()
+        self.current = None     # (name, offset, start time) of the open section
+
+    def section(self, msg : str, *args, name : str = None, offset : int = None):
+        """Start a new section (ending the previous one in the trace) and log msg at SECTION level"""
+        self.log.log(SECTION, msg, *args)
+        if name is not None and (self.trace is not None or self.profile is not None):
+            self._end_section(offset)
+            self.current = (name, offset, time.perf_counter())
+            if self.profile is not None:
+                self.profile.start(name)
+
+    def record(self, msg : str, *args):
+        self.log.log(RECORD, msg, *args)
+
+    def element(self, msg : str, *args):
+        self.log.log(ELEMENT, msg, *args)
+
+    def warning(self, msg : str, *args):
+        self.log.warning(msg, *args)
+
+    def _write(self, entry : dict):
+        self.trace.write(json.dumps(entry) + "\n")
+
+    def _end_section(self, offset : int):
+        if self.current is None:
+            return
+        name, start, started = self.current
+        if self.profile is not None:
+            self.profile.stop(offset - start)
+        if self.trace is not None:
+            self._write({"file": self.filepath, "section": name, "offset": start, "length": offset - start,
+                         "ms": round((time.perf_counter() - started) * 1000, 3)})
+        self.current = None
+
+    def finish(self, offset : int, status = "ok"):
+        """Close the trace: end the open section at offset and write the outcome"""
+        if self.trace is None:
+            if self.profile is not None:
+                self._end_section(offset)
+            return
+        entry = {"file": self.filepath, "status": status, "offset": offset,
+                 "ms": round((time.perf_counter() - self.start) * 1000, 3)}
+        if status == "ok" or self.current is None:
+            self._end_section(offset)
+        else:
+            # Where it broke: the section that was being read and its start
+            entry["section"], entry["section_offset"], _ = self.current
+            if self.profile is not None:
+                self.profile.stop(offset - entry["section_offset"])
+        self._write(entry)
+        self.trace.close()
+        self.trace = None
@@ -1,57 +1,137 @@
-from io import BufferedReader
+import mmap
 import struct
+from functools import lru_cache
+import numpy as np
+
+# All Telltale data is little-endian with fixed-width ints, regardless of the host platform
+_u32 = struct.Struct('<I')
+_i32 = struct.Struct('<i')
+_u16 = struct.Struct('<H')
+_i16 = struct.Struct('<h')
+_f32 = struct.Struct('<f')
+
+@lru_cache(maxsize=None)
+def _struct_n(code : str, n : int) -> struct.Struct:
+  """Precompiled little-endian struct for n repeated items"""
+  return struct.Struct(f'<{n}{code}')
 
 # Weasel's Buffer Reader idk lol
-class WBR(BufferedReader):
+class WBR:
   """
   Collection of macros for smoothly translating RTB's MaxScript
-  
+
+  Cursor over a read-only memory map of the whole file, so reads never
+  copy more than the values they return. Bulk reads (readArray) are
+  zero-copy NumPy views into the mapping
+
   Most of the time long/short ints are unsigned
   """
-  
+
+  def __init__(self, raw):
+    self.name = getattr(raw, 'name', None)
+    try:
+      self._buf = mmap.mmap(raw.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, OSError, AttributeError):
+      # Empty files can't be mapped, in-memory streams have no fileno
+      raw.seek(0)
+      self._buf = raw.read()
+    raw.close()
+    self._pos = 0
+    self.size = len(self._buf)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
+
+  def close(self):
+    if isinstance(self._buf, mmap.mmap):
+      try:
+        self._buf.close()
+      except BufferError:
+        # Arrays returned by readArray still point into the mapping,
+        # it gets released once they are garbage collected
+        pass
+
+  def tell(self) -> int:
+    return self._pos
+
+  def seek(self, offset : int, whence : int = 0) -> int:
+    """Move the cursor, ValueError if that's outside the file (garbage offsets fail right away)"""
+    match whence:
+      case 0: pos = offset
+      case 1: pos = self._pos + offset
+      case 2: pos = self.size + offset
+      case _: raise ValueError(f"invalid whence {whence}")
+    if not 0 <= pos <= self.size:
+      raise ValueError(f"seek to {pos} outside of the file ({self.size} bytes)")
+    self._pos = pos
+    return self._pos
+
+  def read(self, n : int = -1) -> bytes:
+    """Read n raw bytes (or the rest of the file)"""
+    start = self._pos
+    end = self.size if n < 0 else min(start + n, self.size)
+    self._pos = end
+    return bytes(self._buf[start:end])
+
+  def _unpack(self, s : struct.Struct):
+    values = s.unpack_from(self._buf, self._pos)
+    self._pos += s.size
+    return values
+
   def readLong(self, signed = False):
     """Read long int"""
-    return struct.unpack('l' if signed else 'L', self.read(4))[0]
-  
+    return self._unpack(_i32 if signed else _u32)[0]
+
   def readLongs(self, n : int, signed = False):
     """Read multiple long ints"""
-    return struct.unpack(('l' if signed else 'L')*n, self.read(4*n))
+    return self._unpack(_struct_n('i' if signed else 'I', n))
 
   def readLongSigned(self):
     """Shorthand for readLong(signed=True)"""
     return self.readLong(True)
-  
+
   def readShort(self, signed = False):
     """Read short int"""
-    return struct.unpack('h' if signed else 'H', self.read(2))[0]
+    return self._unpack(_i16 if signed else _u16)[0]
 
   def readByte(self):
     """Read single byte as int"""
-    return int.from_bytes(self.read(1))
-  
+    self._pos += 1
+    return self._buf[self._pos - 1]
+
   def readBytes(self, n : int):
     """Read n bytes as ints"""
-    return (int.from_bytes(self.read(1)) for i in range(n))
+    return tuple(self.read(n))
 
   def readString(self, n : int):
-    return ''.join([x.decode() for x in struct.unpack('c'*n, self.read(n))])
-  
+    return self.read(n).decode()
+
   def readFloat(self):
     """Read Float"""
-    return struct.unpack('f', self.read(4))[0]
-  
+    return self._unpack(_f32)[0]
+
   def readFloats(self, n : int):
-    """Read multiple long ints"""
-    return struct.unpack('f'*n, self.read(4*n))
-  
+    """Read multiple floats"""
+    return self._unpack(_struct_n('f', n))
+
+  def readArray(self, dtype, count : int) -> np.ndarray:
+    """Read count items of dtype as a read-only view into the file (no copy)"""
+    dtype = np.dtype(dtype)
+    arr = np.frombuffer(self._buf, dtype=dtype, count=count, offset=self._pos)
+    self._pos += dtype.itemsize * count
+    return arr
+
   def seek_rel(self, offset):
     """Seek relative to current position"""
-    return super().seek(offset, 1)
-  
+    return self.seek(offset, 1)
+
   def seek_abs(self, offset):
     """Seek relative to 0"""
-    return super().seek(offset, 0)
-  
+    return self.seek(offset, 0)
+
   def debugNreads(self, datatype = "L", n=16, offset=0) -> None:
     checkpoint = self.tell()
     self.seek_rel(offset)
@@ -62,4 +142,4 @@ class WBR(BufferedReader):
 
     res = [str(func()) for i in range(n)]
     self.seek_abs(checkpoint)
-    print("\n".join(res))
\ No newline at end of file
+    print("\n".join(res))